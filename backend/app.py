@@ -1,15 +1,23 @@
 import os
 import subprocess
-import uuid
 import shutil
 import sys
+import threading
+import time
+import uuid
 import json
+import mimetypes
 import traceback
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 
 from dotenv import load_dotenv
 
+from cost_model import CostModel, extract_features
+from job_queue import DONE, FAILED, QUEUED, RUNNING, LocalStorage, PermanentJobError, create_broker
+from metadata_store import MetadataStore, code_hash, prompt_hash
+from tex_cache import TexCache, prewarm_script, tex_expressions, write_manim_config
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -19,18 +27,177 @@ CORS(app)  # Enable CORS for development
 
 # Create necessary directories
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-VIDEO_FOLDER = os.path.join(BASE_DIR, "videos")
+VIDEO_FOLDER = os.getenv("VIDEO_FOLDER", os.path.join(BASE_DIR, "videos"))
 TEMP_FOLDER = os.path.join(BASE_DIR, "temp")
+DATA_FOLDER = os.getenv("DATA_FOLDER", os.path.join(BASE_DIR, "data"))
+THUMBNAIL_SUBFOLDER = "thumbnails"
+THUMBNAIL_FOLDER = os.path.join(VIDEO_FOLDER, THUMBNAIL_SUBFOLDER)
 FRONTEND_FOLDER = os.path.join(BASE_DIR, "..", "frontend")
 
 os.makedirs(VIDEO_FOLDER, exist_ok=True)
 os.makedirs(TEMP_FOLDER, exist_ok=True)
+os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
 os.makedirs(FRONTEND_FOLDER, exist_ok=True)
 
+# ------------------ Job Queue ------------------
+# The web tier only enqueues renders and serves results; workers (worker.py)
+# render and upload videos to VIDEO_FOLDER, so every node must share it.
+job_broker = create_broker(os.path.join(DATA_FOLDER, "jobs.db"))
+video_storage = LocalStorage(VIDEO_FOLDER)
+EMBEDDED_WORKERS = int(os.getenv("EMBEDDED_WORKERS", "1"))
+
+# ------------------ Metadata Store ------------------
+# Prompt, hashes, timings and outcome of every request; backs /history and
+# lets identical code reuse an existing render instead of queueing a new one.
+metadata_store = MetadataStore(os.getenv("METADATA_DB_PATH", os.path.join(DATA_FOLDER, "metadata.db")))
+
+# ------------------ Render Scheduling ------------------
+# Jobs are queued with a predicted render time and claimed shortest-first
+# (with aging, see JOB_AGING_RATE); the predictor refits on recorded timings.
+cost_model = CostModel(
+    metadata_store,
+    min_samples=int(os.getenv("COST_MODEL_MIN_SAMPLES", "10")),
+    refit_seconds=int(os.getenv("COST_MODEL_REFIT_SECONDS", "300"))
+)
+
+# ------------------ LaTeX Cache ------------------
+# Compiled MathTex/Tex SVGs shared by every render on this host (or every host,
+# if TEX_CACHE_DIR is on shared storage); see tex_cache.py. A render links
+# only its own expressions' SVGs, but eviction lists the whole directory after
+# any render that compiled something new, so keep TEX_CACHE_MAX_MB modest on
+# network storage.
+TEX_CACHE_FOLDER = os.getenv("TEX_CACHE_DIR", os.path.join(DATA_FOLDER, "tex_cache"))
+TEX_CACHE_MAX_BYTES = int(float(os.getenv("TEX_CACHE_MAX_MB", "200")) * 1024 * 1024)
+TEX_CACHE_PREWARM = os.getenv("TEX_CACHE_PREWARM", "1") == "1"
+tex_cache = TexCache(TEX_CACHE_FOLDER, TEX_CACHE_MAX_BYTES)
+
+# One prompt per branch of generate_manual_fallback
+TEMPLATE_SAMPLE_PROMPTS = ["circle", "pythagoras", "sine", "bounce", "quadratic", "derivative", "animation"]
+
 # ------------------ LLM Configuration ------------------
 # Using Groq (FREE) - Get your key from https://console.groq.com
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # Set your API key here or as environment variable
 
+# ------------------ Render Profiles ------------------
+# Each profile maps to Manim CLI flags plus an optional ffmpeg re-encode pass
+# (preset/crf). Manim does not expose its encoder settings, so the re-encode
+# only runs when a profile asks for it. Add or override profiles with a JSON
+# file pointed to by RENDER_PROFILES_FILE, e.g. {"final": {"fps": 30}}.
+DEFAULT_RENDER_PROFILES = {
+    "draft": {
+        "description": "Fastest turnaround: 240p at 10 fps, no re-encode",
+        "quality": "l",
+        "resolution": [426, 240],
+        "fps": 10,
+        "renderer": "cairo",
+        "format": "mp4",
+        "preset": None,
+        "crf": None,
+        "timeout": 60
+    },
+    "preview": {
+        "description": "480p at 15 fps (Manim -ql)",
+        "quality": "l",
+        "resolution": None,
+        "fps": None,
+        "renderer": "cairo",
+        "format": "mp4",
+        "preset": None,
+        "crf": None,
+        "timeout": 60
+    },
+    "standard": {
+        "description": "720p at 30 fps (Manim -qm)",
+        "quality": "m",
+        "resolution": None,
+        "fps": None,
+        "renderer": "cairo",
+        "format": "mp4",
+        "preset": None,
+        "crf": None,
+        "timeout": 180
+    },
+    "final": {
+        "description": "1080p at 60 fps (Manim -qh), re-encoded with x264 slow/CRF 18",
+        "quality": "h",
+        "resolution": None,
+        "fps": None,
+        "renderer": "cairo",
+        "format": "mp4",
+        "preset": "slow",
+        "crf": 18,
+        "timeout": 600
+    }
+}
+
+VIDEO_ENCODERS = {
+    "mp4": "libx264",
+    "mov": "libx264",
+    "webm": "libvpx-vp9"
+}
+
+def load_render_profiles():
+    """Load render profiles, merging RENDER_PROFILES_FILE over the defaults"""
+    profiles = {name: dict(settings) for name, settings in DEFAULT_RENDER_PROFILES.items()}
+    
+    profiles_file = os.getenv("RENDER_PROFILES_FILE")
+    if not profiles_file:
+        return profiles
+    
+    try:
+        with open(profiles_file, encoding="utf-8") as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not load render profiles from {profiles_file}: {e}")
+        return profiles
+    
+    if not isinstance(overrides, dict):
+        print(f"Could not load render profiles from {profiles_file}: expected a JSON object of profiles")
+        return profiles
+    
+    for name, settings in overrides.items():
+        if not isinstance(settings, dict):
+            print(f"Skipping render profile {name!r} in {profiles_file}: expected a JSON object")
+            continue
+        # New profiles start from "preview" so they only need to list what differs
+        base = profiles.get(name, DEFAULT_RENDER_PROFILES["preview"])
+        profiles[name] = {**base, **settings}
+    
+    return profiles
+
+def load_default_profile(profiles):
+    """DEFAULT_RENDER_PROFILE if it names a known profile, otherwise preview"""
+    name = os.getenv("DEFAULT_RENDER_PROFILE", "preview")
+    if name not in profiles:
+        print(f"Unknown DEFAULT_RENDER_PROFILE {name!r}, using 'preview'")
+        return "preview"
+    return name
+
+RENDER_PROFILES = load_render_profiles()
+DEFAULT_RENDER_PROFILE = load_default_profile(RENDER_PROFILES)
+
+# Written by benchmark_profiles.py: measured cost of each profile
+PROFILE_BENCHMARKS_FILE = os.getenv("PROFILE_BENCHMARKS_FILE", os.path.join(BASE_DIR, "render_profile_benchmarks.json"))
+
+def load_profile_benchmarks():
+    """Recorded benchmark results by profile name ({} until the benchmark has run)"""
+    if not os.path.exists(PROFILE_BENCHMARKS_FILE):
+        return {}
+    try:
+        with open(PROFILE_BENCHMARKS_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read profile benchmarks: {e}")
+        return {}
+
+# ------------------ Thumbnails ------------------
+POSTER_POSITION = 0.75  # Fraction of the video to take the poster frame from
+POSTER_WIDTH = 640
+SPRITE_COLUMNS = 5
+SPRITE_ROWS = 2
+SPRITE_THUMB_WIDTH = 160
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+
 # ------------------ System Checks ------------------
 def check_system_requirements():
     """Check if all requirements are met"""
@@ -468,98 +635,132 @@ class GeneratedScene(Scene):
         
         self.play(*[FadeOut(obj) for obj in [*shapes, equation, title]])"""
 
-# ------------------ Main Generation Endpoint ------------------
-@app.route("/")
-def home():
-    """Serve the frontend HTML"""
-    html_path = os.path.join(FRONTEND_FOLDER, "index.html")
-    if os.path.exists(html_path):
-        return send_from_directory(FRONTEND_FOLDER, "index.html")
-    else:
-        # Return inline HTML if file doesn't exist
-        return """
-        <!DOCTYPE html>
-        <html>
-        <head><title>Manim Generator</title></head>
-        <body>
-            <h1>Manim Generator</h1>
-            <p>Frontend HTML file not found. Please create frontend/index.html with the provided code.</p>
-        </body>
-        </html>
-        """
+# ------------------ Rendering ------------------
+def build_render_command(python_cmd, script_path, output_dir, profile, config_file=None):
+    """Build the Manim CLI command for a render profile"""
+    cmd = [
+        python_cmd,
+        "-m", "manim",
+        "render",
+        script_path,
+        "GeneratedScene",
+        "--media_dir", output_dir,
+        f"-q{profile['quality']}",
+        "--renderer", profile["renderer"],
+        "--format", profile["format"],
+        "--disable_caching",
+        "-v", "WARNING"
+    ]
+    
+    # Explicit resolution/fps override the quality preset
+    if profile.get("resolution"):
+        width, height = profile["resolution"]
+        cmd += ["-r", f"{width},{height}"]
+    if profile.get("fps"):
+        cmd += ["--fps", str(profile["fps"])]
+    
+    # The OpenGL renderer opens a preview window unless told to write a movie
+    if profile["renderer"] == "opengl":
+        cmd.append("--write_to_movie")
+    
+    if config_file:
+        cmd += ["--config_file", config_file]
+    
+    return cmd
 
-@app.route("/generate", methods=["POST"])
-def generate_code():
-    """Main endpoint to generate Manim animation"""
-    data = request.json
-    prompt = data.get("prompt", "")
+def finalize_video(video_path, final_video_path, profile):
+    """Copy the rendered video into place, re-encoding if the profile asks for it"""
+    encoder = VIDEO_ENCODERS.get(profile["format"])
+    if not encoder or (profile.get("preset") is None and profile.get("crf") is None):
+        shutil.copy(video_path, final_video_path)
+        return
     
-    if not prompt.strip():
-        return jsonify({"error": "Prompt is required"}), 400
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", video_path, "-c:v", encoder]
+    if profile.get("preset") is not None:
+        cmd += ["-preset", str(profile["preset"])]
+    if profile.get("crf") is not None:
+        cmd += ["-crf", str(profile["crf"])]
+        if encoder == "libvpx-vp9":
+            cmd += ["-b:v", "0"]  # Constant quality mode for VP9
+    if encoder == "libx264":
+        cmd += ["-pix_fmt", "yuv420p", "-movflags", "+faststart"]
+    cmd.append(final_video_path)
     
-    # Check system
-    checks = check_system_requirements()
-    if not checks["manim_installed"]:
-        return jsonify({
-            "error": "Manim not installed",
-            "details": "Install with: pip install manim",
-            "checks": checks
-        }), 500
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=profile["timeout"])
+        if result.returncode == 0:
+            return
+        print(f"Re-encode failed, keeping Manim output: {result.stderr[:500]}")
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Re-encode failed, keeping Manim output: {e}")
     
-    python_cmd = find_python_with_manim()
-    if not python_cmd:
-        return jsonify({
-            "error": "Python with Manim not found",
-            "details": "Please ensure Manim is installed: pip install manim",
-            "checks": checks
-        }), 500
+    shutil.copy(video_path, final_video_path)
+
+class RenderError(PermanentJobError):
+    """A render that failed for reasons retrying will not fix"""
     
-    unique_id = uuid.uuid4().hex[:8]
-    script_name = f"scene_{unique_id}.py"
-    script_path = os.path.join(TEMP_FOLDER, script_name)
+    def __init__(self, error, details="", manim_code=None):
+        super().__init__(error)
+        self.error = error
+        self.details = details
+        self.manim_code = manim_code
+
+class RenderCancelled(Exception):
+    """The worker lost its lease, so another attempt owns the job now"""
+
+def run_render_process(cmd, timeout, cancelled=None, **kwargs):
+    """subprocess.run for renders that kills the process once cancelled is set"""
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kwargs)
+    deadline = time.time() + timeout
+    
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=1)
+            return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            if cancelled is not None and cancelled.is_set():
+                process.kill()
+                process.communicate()
+                raise RenderCancelled()
+            if time.time() > deadline:
+                process.kill()
+                process.communicate()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+
+def render_animation(python_cmd, manim_code, profile, job_id, storage, cancelled=None):
+    """Render a scene with a profile and upload the video; return the job result"""
+    # Scratch paths are per attempt: a worker that lost its lease may still be
+    # finishing up while the job's next attempt starts on the same host
+    scratch_id = f"{job_id}_{uuid.uuid4().hex[:6]}"
+    script_path = os.path.join(TEMP_FOLDER, f"scene_{scratch_id}.py")
+    output_dir = os.path.join(TEMP_FOLDER, f"output_{scratch_id}")
+    os.makedirs(output_dir, exist_ok=True)
+    expressions = tex_expressions(manim_code)
+    tex_dir, seeded = tex_cache.prepare(scratch_id, expressions)
+    submitted_code = manim_code
     
     try:
-        # Generate Manim code
-        print(f"Generating code for: {prompt}")
-        manim_code = generate_manim_code_with_llm(prompt)
-        
-        # Validate code has required structure
-        if "class GeneratedScene" not in manim_code:
-            print("Invalid code structure, using fallback")
-            manim_code = generate_manual_fallback(prompt)
-        
         # Save the script
         with open(script_path, "w", encoding="utf-8") as f:
             f.write(manim_code)
         
         print(f"Saved script to: {script_path}")
         
-        # Prepare output directory
-        output_dir = os.path.join(VIDEO_FOLDER, f"output_{unique_id}")
-        os.makedirs(output_dir, exist_ok=True)
+        # Point Manim's tex_dir at this job's view of the shared LaTeX cache
+        config_file = os.path.join(output_dir, "manim.cfg")
+        write_manim_config(config_file, tex_dir)
         
         # Run Manim command
-        cmd = [
-            python_cmd,
-            "-m", "manim",
-            "render",
-            script_path,
-            "GeneratedScene",
-            "--media_dir", output_dir,
-            "-ql",  # Low quality for faster rendering
-            "--disable_caching",
-            "-v", "WARNING"
-        ]
+        cmd = build_render_command(python_cmd, script_path, output_dir, profile, config_file)
         
         print(f"Running: {' '.join(cmd)}")
         
         # Execute Manim
         env = os.environ.copy()
-        result = subprocess.run(
+        result = run_render_process(
             cmd,
-            capture_output=True,
-            text=True,
-            timeout=60,
+            profile["timeout"],
+            cancelled,
             cwd=TEMP_FOLDER,
             env=env
         )
@@ -583,55 +784,317 @@ class GeneratedScene(Scene):
             with open(script_path, "w", encoding="utf-8") as f:
                 f.write(fallback_code)
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, cwd=TEMP_FOLDER)
+            result = run_render_process(cmd, profile["timeout"], cancelled, cwd=TEMP_FOLDER)
             
             if result.returncode != 0:
-                return jsonify({
-                    "error": "Animation rendering failed",
-                    "details": error_msg[:500],
-                    "manim_code": manim_code
-                }), 500
+                raise RenderError("Animation rendering failed", error_msg[:500], manim_code)
             
             manim_code = fallback_code
         
+        # Share newly compiled LaTeX with later renders
+        tex_stats = tex_cache.publish(tex_dir, seeded, expressions)
+        print(f"Tex cache: {tex_stats['hits']} hits, {tex_stats['misses']} misses "
+              f"({tex_stats['seeded']} seeded)")
+        
         # Find the generated video file
         video_path = None
         
-        # Search for MP4 file in output directory
+        # Search for the video file in output directory
+        extension = f".{profile['format']}"
         for root, dirs, files in os.walk(output_dir):
             for file in files:
-                if file.endswith(".mp4"):
+                if file.endswith(extension) and "partial_movie_files" not in root:
                     video_path = os.path.join(root, file)
                     break
             if video_path:
                 break
         
         if not video_path:
-            return jsonify({
-                "error": "Video file not found after generation",
-                "details": f"Output directory: {output_dir}",
-                "manim_code": manim_code
-            }), 500
-        
-        # Copy video to videos folder
-        final_video_name = f"animation_{unique_id}.mp4"
-        final_video_path = os.path.join(VIDEO_FOLDER, final_video_name)
-        shutil.copy(video_path, final_video_path)
+            raise RenderError("Video file not found after generation",
+                              f"Output directory: {output_dir}", manim_code)
+        
+        # Finalize locally, then upload to shared storage
+        final_video_name = f"animation_{job_id}{extension}"
+        final_video_path = os.path.join(output_dir, final_video_name)
+        finalize_video(video_path, final_video_path, profile)
+        if cancelled is not None and cancelled.is_set():
+            raise RenderCancelled()
+        storage.put(final_video_path, final_video_name)
         
-        print(f"Video saved to: {final_video_path}")
+        print(f"Video saved as: {final_video_name}")
+        
+        result = {
+            "manim_code": manim_code,
+            "video_url": f"/videos/{final_video_name}",
+            "file_size": os.path.getsize(final_video_path),
+            "fell_back": manim_code != submitted_code,
+            "tex_cache": tex_stats
+        }
         
+        # Poster and sprite let clients preview without downloading the video
+        thumbnails = generate_thumbnails(final_video_path, output_dir, f"animation_{job_id}")
+        if thumbnails:
+            for kind in ("poster", "sprite"):
+                name = os.path.basename(thumbnails[f"{kind}_path"])
+                storage.put(thumbnails[f"{kind}_path"], f"{THUMBNAIL_SUBFOLDER}/{name}")
+                result[f"{kind}_url"] = f"/thumbnails/{name}"
+            result["video_seconds"] = thumbnails["duration"]
+            result["sprite"] = thumbnails["sprite"]
+        
+        return result
+    
+    except subprocess.TimeoutExpired:
+        # A scene too heavy for the profile's limit will not render faster on retry
+        raise RenderError("Animation rendering timed out",
+                          f"Rendering took longer than {profile['timeout']}s", manim_code)
+    
+    finally:
         # Cleanup temporary files
         try:
-            os.remove(script_path)
+            if os.path.exists(script_path):
+                os.remove(script_path)
             shutil.rmtree(output_dir, ignore_errors=True)
+            tex_cache.release(tex_dir)
         except Exception as e:
             print(f"Cleanup warning: {e}")
+
+def render_job(job, cancelled=None):
+    """Render a queued job; used by the workers in worker.py
+
+    Workers may run on other nodes with their own DATA_FOLDER, so they leave
+    the metadata store alone: timings and outputs travel back in the job
+    result and the web tier records them (see reconcile_renders).
+    """
+    payload = job["payload"]
+    started = time.time()
+    
+    profile = RENDER_PROFILES.get(payload["profile"])
+    if not profile:
+        raise RenderError(f"Unknown render profile: {payload['profile']}", manim_code=payload["manim_code"])
+    
+    python_cmd = find_python_with_manim()
+    if not python_cmd:
+        raise RenderError("Python with Manim not found",
+                          "Please ensure Manim is installed: pip install manim",
+                          payload["manim_code"])
+    
+    result = render_animation(python_cmd, payload["manim_code"], profile, job["id"],
+                              video_storage, cancelled)
+    
+    result["render_seconds"] = time.time() - started
+    result["queue_seconds"] = job["started_at"] - job["created_at"]
+    if job.get("predicted_seconds") is not None:
+        print(f"Job {job['id']} rendered in {result['render_seconds']:.1f}s "
+              f"(predicted {job['predicted_seconds']:.1f}s)")
+    return result
+
+def probe_video_duration(video_path):
+    """Duration of a video in seconds, via ffprobe (reads the header only)"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", video_path],
+        capture_output=True, text=True, timeout=30
+    )
+    return float(result.stdout.strip())
+
+def generate_thumbnails(video_path, output_dir, base_name):
+    """Extract a poster frame and a thumbnail sprite sheet in one ffmpeg pass"""
+    try:
+        duration = probe_video_duration(video_path)
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        print(f"Thumbnail warning: could not read duration: {e}")
+        return None
+    
+    count = SPRITE_COLUMNS * SPRITE_ROWS
+    poster_name = f"{base_name}_poster.jpg"
+    sprite_name = f"{base_name}_sprite.jpg"
+    poster_path = os.path.join(output_dir, poster_name)
+    sprite_path = os.path.join(output_dir, sprite_name)
+    
+    # Templates end by fading everything out, so the poster comes from before the end
+    poster_time = duration * POSTER_POSITION
+    filters = (
+        f"[0:v]split=2[p][s];"
+        f"[p]select='gte(t,{poster_time:.3f})',scale={POSTER_WIDTH}:-2[poster];"
+        f"[s]fps={count}/{duration:.3f},scale={SPRITE_THUMB_WIDTH}:-2,"
+        f"tile={SPRITE_COLUMNS}x{SPRITE_ROWS}[sprite]"
+    )
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", "-i", video_path,
+        "-filter_complex", filters,
+        "-map", "[poster]", "-frames:v", "1", "-q:v", "4", poster_path,
+        "-map", "[sprite]", "-frames:v", "1", "-q:v", "5", sprite_path
+    ]
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Thumbnail warning: {e}")
+        return None
+    
+    if result.returncode != 0 or not (os.path.exists(poster_path) and os.path.exists(sprite_path)):
+        print(f"Thumbnail warning: {result.stderr[:500]}")
+        return None
+    
+    return {
+        "duration": duration,
+        "poster_path": poster_path,
+        "sprite_path": sprite_path,
+        "sprite": {
+            "columns": SPRITE_COLUMNS,
+            "rows": SPRITE_ROWS,
+            "count": count,
+            "thumb_width": SPRITE_THUMB_WIDTH,
+            "interval": duration / count
+        }
+    }
+
+def prewarm_tex_cache():
+    """Compile every MathTex/Tex expression used by the built-in templates into the cache"""
+    python_cmd = find_python_with_manim()
+    if not python_cmd:
+        print("Tex cache prewarm skipped: Python with Manim not found")
+        return
+    
+    expressions = []
+    for prompt in TEMPLATE_SAMPLE_PROMPTS:
+        for expression in tex_expressions(generate_manual_fallback(prompt)):
+            if expression not in expressions:
+                expressions.append(expression)
+    
+    prewarm_id = f"prewarm_{uuid.uuid4().hex[:8]}"
+    work_dir = os.path.join(TEMP_FOLDER, prewarm_id)
+    os.makedirs(work_dir, exist_ok=True)
+    tex_dir, seeded = tex_cache.prepare(prewarm_id, expressions)
+    
+    try:
+        script_path = os.path.join(work_dir, "prewarm.py")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(prewarm_script(expressions))
+        
+        config_file = os.path.join(work_dir, "manim.cfg")
+        write_manim_config(config_file, tex_dir)
+        
+        # --dry_run builds the mobjects (compiling the LaTeX) without writing video
+        cmd = [
+            python_cmd, "-m", "manim", "render", script_path, "PrewarmScene",
+            "--media_dir", work_dir,
+            "--config_file", config_file,
+            "--dry_run",
+            "-v", "WARNING"
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300, cwd=work_dir)
+        if result.returncode != 0:
+            print(f"Tex cache prewarm failed: {(result.stderr or result.stdout)[:500]}")
+        
+        tex_stats = tex_cache.publish(tex_dir, seeded, expressions)
+        print(f"Tex cache prewarmed {len(expressions)} expressions "
+              f"({tex_stats['hits']} already cached, {tex_stats['misses']} compiled)")
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Tex cache prewarm failed: {e}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        tex_cache.release(tex_dir)
+
+# ------------------ Main Generation Endpoint ------------------
+@app.route("/")
+def home():
+    """Serve the frontend HTML"""
+    html_path = os.path.join(FRONTEND_FOLDER, "index.html")
+    if os.path.exists(html_path):
+        return send_from_directory(FRONTEND_FOLDER, "index.html")
+    else:
+        # Return inline HTML if file doesn't exist
+        return """
+        <!DOCTYPE html>
+        <html>
+        <head><title>Manim Generator</title></head>
+        <body>
+            <h1>Manim Generator</h1>
+            <p>Frontend HTML file not found. Please create frontend/index.html with the provided code.</p>
+        </body>
+        </html>
+        """
+
+@app.route("/generate", methods=["POST"])
+def generate_code():
+    """Main endpoint: generate Manim code and queue it for rendering"""
+    data = request.json
+    prompt = data.get("prompt", "")
+    profile_name = data.get("profile") or DEFAULT_RENDER_PROFILE
+    
+    if not prompt.strip():
+        return jsonify({"error": "Prompt is required"}), 400
+    
+    if not isinstance(profile_name, str) or profile_name not in RENDER_PROFILES:
+        return jsonify({
+            "error": f"Unknown render profile: {profile_name}",
+            "profiles": list(RENDER_PROFILES)
+        }), 400
+    
+    try:
+        # Generate Manim code
+        print(f"Generating code for: {prompt}")
+        generation_started = time.time()
+        manim_code = generate_manim_code_with_llm(prompt)
+        
+        # Validate code has required structure
+        if "class GeneratedScene" not in manim_code:
+            print("Invalid code structure, using fallback")
+            manim_code = generate_manual_fallback(prompt)
+        generation_seconds = time.time() - generation_started
+        
+        job_id = uuid.uuid4().hex[:8]
+        hashes = {"prompt_hash": prompt_hash(prompt), "code_hash": code_hash(manim_code)}
+        
+        # Identical code with the same profile was already rendered; reuse it
+        previous = metadata_store.find_completed_render(manim_code, profile_name)
+        if previous and os.path.exists(os.path.join(VIDEO_FOLDER, previous["video_name"])):
+            print(f"Reusing render of job {previous['job_id']}")
+            metadata_store.record_request(
+                job_id, prompt, manim_code, profile_name, DONE,
+                generation_seconds=generation_seconds, cached=True, fell_back=0,
+                video_name=previous["video_name"], file_size=previous["file_size"],
+                video_seconds=previous["video_seconds"],
+                poster_name=previous["poster_name"], sprite_name=previous["sprite_name"]
+            )
+            return jsonify({
+                "success": True,
+                "job_id": job_id,
+                "status": DONE,
+                "manim_code": manim_code,
+                "video_url": f"/videos/{previous['video_name']}",
+                "poster_url": f"/thumbnails/{previous['poster_name']}" if previous["poster_name"] else None,
+                "sprite_url": f"/thumbnails/{previous['sprite_name']}" if previous["sprite_name"] else None,
+                "profile": profile_name,
+                "cached": True,
+                **hashes
+            })
+        
+        # Rendering happens on a worker; the client polls the status URL
+        features = extract_features(manim_code, RENDER_PROFILES[profile_name])
+        predicted_seconds = cost_model.predict(features)
+        metadata_store.record_request(job_id, prompt, manim_code, profile_name, QUEUED,
+                                      generation_seconds=generation_seconds,
+                                      features=json.dumps(features),
+                                      predicted_seconds=predicted_seconds)
+        job_broker.enqueue({
+            "prompt": prompt,
+            "manim_code": manim_code,
+            "profile": profile_name
+        }, job_id=job_id, predicted_seconds=predicted_seconds)
+        print(f"Queued render job: {job_id} (predicted {predicted_seconds:.1f}s)")
         
         return jsonify({
             "success": True,
+            "job_id": job_id,
+            "status": QUEUED,
+            "status_url": f"/jobs/{job_id}",
             "manim_code": manim_code,
-            "video_url": f"/videos/{final_video_name}"
-        })
+            "profile": profile_name,
+            "predicted_seconds": predicted_seconds,
+            **hashes
+        }), 202
     
     except Exception as e:
         error_trace = traceback.format_exc()
@@ -641,10 +1104,190 @@ class GeneratedScene(Scene):
             "details": str(e)
         }), 500
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Report the status of a render job"""
+    record = metadata_store.get(job_id)
+    if record:
+        # Polling is what normally records a finished render
+        record = reconcile_renders([record])[0]
+    
+    job = job_broker.get(job_id)
+    if not job:
+        # Requests served from an earlier render never reach the queue
+        if record and record["cached"]:
+            return jsonify({"job_id": job_id, "success": True, **serialize_render(record)})
+        return jsonify({"error": "Job not found"}), 404
+    
+    response = {
+        "job_id": job_id,
+        "status": job["status"],
+        "profile": job["payload"]["profile"],
+        "manim_code": job["payload"]["manim_code"],
+        "attempts": job["attempts"],
+        "predicted_seconds": job["predicted_seconds"]
+    }
+    
+    if job["status"] == DONE:
+        response.update(success=True, **job["result"])
+    elif job["status"] == FAILED:
+        response.update(job["error"])
+    
+    return jsonify(response)
+
+def job_metadata_fields(job):
+    """Metadata columns describing a broker job's current state"""
+    fields = {"status": job["status"]}
+    # A requeued job keeps the started_at of its last attempt
+    if job["started_at"] is not None and job["status"] != QUEUED:
+        fields["queue_seconds"] = job["started_at"] - job["created_at"]
+    
+    if job["status"] == DONE:
+        result = job["result"]
+        fields.update(
+            queue_seconds=result.get("queue_seconds", fields.get("queue_seconds")),
+            render_seconds=result.get("render_seconds"),
+            file_size=result["file_size"],
+            video_name=os.path.basename(result["video_url"]),
+            video_seconds=result.get("video_seconds"),
+            fell_back=int(result["fell_back"]),
+            tex_cache_hits=result["tex_cache"]["hits"],
+            tex_cache_misses=result["tex_cache"]["misses"],
+            poster_name=os.path.basename(result["poster_url"]) if "poster_url" in result else None,
+            sprite_name=os.path.basename(result["sprite_url"]) if "sprite_url" in result else None
+        )
+    elif job["status"] == FAILED:
+        if job["started_at"] is not None and job["finished_at"] is not None:
+            fields["render_seconds"] = job["finished_at"] - job["started_at"]
+        if job["error"]:
+            fields["error"] = job["error"].get("error")
+    
+    return fields
+
+def reconcile_renders(rows):
+    """Bring queued/running metadata rows in line with the broker
+
+    Workers report outcomes only to the broker, and the broker itself requeues
+    or fails jobs whose worker lost its lease, so rows are updated here, when
+    they are read.
+    """
+    pending = [row for row in rows if not row["cached"] and row["status"] in (QUEUED, RUNNING)]
+    if not pending:
+        return rows
+    
+    # Expired leases are otherwise only reclaimed when a worker claims a job
+    job_broker.reclaim_stale()
+    
+    updated = {}
+    for row in pending:
+        job = job_broker.get(row["job_id"])
+        if not job or job["status"] == row["status"]:
+            continue
+        
+        fields = job_metadata_fields(job)
+        metadata_store.update(row["job_id"], **fields)
+        updated[row["job_id"]] = {**row, **fields}
+    
+    return [updated.get(row["job_id"], row) for row in rows]
+
+def serialize_render(row):
+    """Shape a metadata row for the history API"""
+    item = dict(row)
+    item["cached"] = bool(item["cached"])
+    item["fell_back"] = None if item["fell_back"] is None else bool(item["fell_back"])
+    item["video_url"] = f"/videos/{item['video_name']}" if item["video_name"] else None
+    item["poster_url"] = f"/thumbnails/{item['poster_name']}" if item["poster_name"] else None
+    item["sprite_url"] = f"/thumbnails/{item['sprite_name']}" if item["sprite_name"] else None
+    return item
+
+@app.route("/history", methods=["GET"])
+def render_history():
+    """Paginated history of generation requests, newest first"""
+    try:
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 20))
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+    
+    if page < 1 or not 1 <= per_page <= 100:
+        return jsonify({"error": "page must be >= 1 and per_page between 1 and 100"}), 400
+    
+    rows, total = metadata_store.history(page, per_page, request.args.get("status"))
+    return jsonify({
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+        "items": [serialize_render(row) for row in reconcile_renders(rows)]
+    })
+
+@app.route("/history/hash/<hash_value>", methods=["GET"])
+def render_history_by_hash(hash_value):
+    """Requests whose normalized-prompt hash or code hash matches"""
+    rows = metadata_store.find_by_hash(hash_value.lower())
+    return jsonify({
+        "hash": hash_value,
+        "items": [serialize_render(row) for row in reconcile_renders(rows)]
+    })
+
+@app.route("/metrics/render-cost", methods=["GET"])
+def render_cost_metrics():
+    """Predicted vs. actual render times of recent jobs, for monitoring the scheduler"""
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
+    # Record renders no client has polled for since they finished
+    reconcile_renders(metadata_store.unfinished())
+    pairs = metadata_store.prediction_pairs(limit)
+    errors = [pair["predicted_seconds"] - pair["render_seconds"] for pair in pairs]
+    percentage_errors = [
+        abs(e) / pair["render_seconds"] * 100 for e, pair in zip(errors, pairs) if pair["render_seconds"] > 0
+    ]
+    summary = None
+    if pairs:
+        summary = {
+            "count": len(pairs),
+            "mean_error_seconds": sum(errors) / len(errors),
+            "mean_absolute_error_seconds": sum(abs(e) for e in errors) / len(errors),
+            "mean_absolute_percentage_error": (
+                sum(percentage_errors) / len(percentage_errors) if percentage_errors else None
+            )
+        }
+    
+    return jsonify({
+        "model": cost_model.describe(),
+        "summary": summary,
+        "jobs": pairs
+    })
+
 @app.route("/videos/<path:filename>")
 def serve_video(filename):
     """Serve generated video files"""
-    return send_from_directory(VIDEO_FOLDER, filename, mimetype="video/mp4")
+    mimetype = mimetypes.guess_type(filename)[0] or "video/mp4"
+    return send_from_directory(VIDEO_FOLDER, filename, mimetype=mimetype)
+
+@app.route("/thumbnails/<path:filename>")
+def serve_thumbnail(filename):
+    """Serve poster frames and sprite sheets; names are unique per job, so cache them for good"""
+    response = send_from_directory(THUMBNAIL_FOLDER, filename, mimetype="image/jpeg",
+                                   max_age=THUMBNAIL_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route("/profiles", methods=["GET"])
+def list_profiles():
+    """List the available render profiles with their benchmarked cost, where measured"""
+    benchmarks = load_profile_benchmarks()
+    return jsonify({
+        "default": DEFAULT_RENDER_PROFILE,
+        "profiles": {
+            name: {**profile, "benchmark": benchmarks.get(name)}
+            for name, profile in RENDER_PROFILES.items()
+        }
+    })
 
 @app.route("/health", methods=["GET"])
 def health_check():
@@ -660,8 +1303,10 @@ def health_check():
         "directories": {
             "video_folder": VIDEO_FOLDER,
             "temp_folder": TEMP_FOLDER,
+            "data_folder": DATA_FOLDER,
             "frontend_folder": FRONTEND_FOLDER
-        }
+        },
+        "tex_cache": tex_cache.stats()
     })
 
 @app.route("/setup-info", methods=["GET"])
@@ -714,6 +1359,8 @@ def server_error(e):
 
 # ------------------ Main Entry Point ------------------
 if __name__ == "__main__":
+    from worker import start_workers
+    
     print("=" * 60)
     print("🎬 MANIM AI ANIMATION GENERATOR")
     print("=" * 60)
@@ -741,6 +1388,7 @@ if __name__ == "__main__":
     print(f"\n📁 Directories:")
     print(f"  • Videos: {VIDEO_FOLDER}")
     print(f"  • Temp: {TEMP_FOLDER}")
+    print(f"  • Data: {DATA_FOLDER}")
     print(f"  • Frontend: {FRONTEND_FOLDER}")
     
     # API info
@@ -755,9 +1403,20 @@ if __name__ == "__main__":
     print("📝 API Endpoints:")
     print("  • GET  /          - Web Interface")
     print("  • POST /generate  - Generate Animation")
+    print("  • GET  /jobs/<id> - Render Job Status")
+    print("  • GET  /history   - Render History")
+    print("  • GET  /metrics/render-cost - Predicted vs. Actual Render Times")
+    print("  • GET  /profiles  - Render Profiles")
     print("  • GET  /health    - System Health Check")
     print("  • GET  /setup-info - Setup Instructions")
     print("=" * 60 + "\n")
     
+    # Render workers sharing this process; run worker.py for more capacity
+    if EMBEDDED_WORKERS > 0:
+        if TEX_CACHE_PREWARM:
+            threading.Thread(target=prewarm_tex_cache, daemon=True).start()
+        start_workers(job_broker, render_job, EMBEDDED_WORKERS)
+        print(f"🛠️  Embedded render workers: {EMBEDDED_WORKERS}\n")
+    
     # Start Flask app
     app.run(debug=True, host="0.0.0.0", port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Benchmark render profiles.
+
+Renders the built-in fallback templates with every render profile and reports
+CPU-seconds spent per second of output video, so profile costs can be compared
+and documented. Run from the backend folder:
+
+    python benchmark_profiles.py [--cold] [profile ...]
+
+Renders go through a LaTeX cache prewarmed the way workers prewarm theirs at
+startup, so the numbers match steady-state production renders; --cold gives
+every render an empty cache instead. Results are printed as a table and saved
+to render_profile_benchmarks.json, which GET /profiles reports next to each
+profile.
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows: fall back to wall-clock time
+    resource = None
+
+# Importing app opens the job queue, metadata store and LaTeX cache; keep the
+# benchmark's copies away from the real ones
+SCRATCH_DATA_FOLDER = tempfile.mkdtemp(prefix="manim_benchmark_")
+atexit.register(shutil.rmtree, SCRATCH_DATA_FOLDER, ignore_errors=True)
+# (set explicitly rather than unset, so values from .env cannot override them)
+os.environ.update({
+    "DATA_FOLDER": SCRATCH_DATA_FOLDER,
+    "JOB_BROKER": "sqlite",
+    "JOB_DB_PATH": os.path.join(SCRATCH_DATA_FOLDER, "jobs.db"),
+    "METADATA_DB_PATH": os.path.join(SCRATCH_DATA_FOLDER, "metadata.db"),
+    "TEX_CACHE_DIR": os.path.join(SCRATCH_DATA_FOLDER, "tex_cache")
+})
+
+from app import (
+    PROFILE_BENCHMARKS_FILE,
+    RENDER_PROFILES,
+    TEMP_FOLDER,
+    build_render_command,
+    finalize_video,
+    find_python_with_manim,
+    generate_manual_fallback,
+    prewarm_tex_cache,
+    probe_video_duration,
+    tex_cache,
+)
+from tex_cache import tex_expressions, write_manim_config
+
+BENCHMARK_PROMPTS = [
+    "Show a circle transforming into a square",
+    "Demonstrate the Pythagorean theorem",
+    "Create sine and cosine wave animations",
+    "Animate a bouncing ball with physics",
+]
+
+def children_cpu_seconds():
+    """CPU time (user + system) used by finished child processes"""
+    if resource is None:
+        return time.perf_counter()
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def benchmark_profile(python_cmd, profile_name, prompt, cold):
+    """Render one prompt with one profile; return (cpu_seconds, output_seconds, bytes)"""
+    profile = RENDER_PROFILES[profile_name]
+    scratch_id = f"bench_{uuid.uuid4().hex[:8]}"
+    work_dir = os.path.join(TEMP_FOLDER, scratch_id)
+    os.makedirs(work_dir, exist_ok=True)
+    script_path = os.path.join(work_dir, "scene.py")
+    manim_code = generate_manual_fallback(prompt)
+
+    if cold:
+        tex_dir, seeded = os.path.join(work_dir, "Tex"), set()
+    else:
+        tex_dir, seeded = tex_cache.prepare(scratch_id, tex_expressions(manim_code))
+
+    try:
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(manim_code)
+
+        config_file = os.path.join(work_dir, "manim.cfg")
+        write_manim_config(config_file, tex_dir)
+
+        cmd = build_render_command(python_cmd, script_path, work_dir, profile, config_file)
+        cpu_before = children_cpu_seconds()
+        result = subprocess.run(cmd, capture_output=True, text=True,
+                                timeout=profile["timeout"], cwd=work_dir)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr[-500:])
+
+        extension = f".{profile['format']}"
+        video_path = next(
+            os.path.join(root, file)
+            for root, dirs, files in os.walk(work_dir)
+            if "partial_movie_files" not in root
+            for file in files if file.endswith(extension)
+        )
+        final_path = os.path.join(work_dir, f"final{extension}")
+        finalize_video(video_path, final_path, profile)
+        cpu_seconds = children_cpu_seconds() - cpu_before
+
+        return cpu_seconds, probe_video_duration(final_path), os.path.getsize(final_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if not cold:
+            tex_cache.release(tex_dir)
+
+def main(profile_names, cold):
+    python_cmd = find_python_with_manim()
+    if not python_cmd:
+        print("Python with Manim not found")
+        return 1
+
+    if not cold:
+        prewarm_tex_cache()
+
+    unit = "CPU-s" if resource is not None else "wall-s"
+    print(f"\n| Profile | {unit} | Output s | {unit} per output s | Avg size (KB) |")
+    print("|---|---|---|---|---|")
+
+    results = {}
+    for name in profile_names:
+        total_cpu = total_output = total_bytes = 0.0
+        for prompt in BENCHMARK_PROMPTS:
+            cpu_seconds, output_seconds, size = benchmark_profile(python_cmd, name, prompt, cold)
+            total_cpu += cpu_seconds
+            total_output += output_seconds
+            total_bytes += size
+
+        results[name] = {
+            "cpu_seconds_per_output_second": round(total_cpu / total_output, 3),
+            "average_size_kb": round(total_bytes / len(BENCHMARK_PROMPTS) / 1024),
+            "measure": "cpu" if resource is not None else "wall",
+            "tex_cache": "cold" if cold else "warm",
+            "measured_at": time.strftime("%Y-%m-%d")
+        }
+        print(f"| {name} | {total_cpu:.1f} | {total_output:.1f} | "
+              f"{total_cpu / total_output:.2f} | {results[name]['average_size_kb']} |")
+
+    # Merge so benchmarking a single profile keeps the others' numbers
+    recorded = {}
+    if os.path.exists(PROFILE_BENCHMARKS_FILE):
+        with open(PROFILE_BENCHMARKS_FILE, encoding="utf-8") as f:
+            recorded = json.load(f)
+    recorded.update(results)
+    with open(PROFILE_BENCHMARKS_FILE, "w", encoding="utf-8") as f:
+        json.dump(recorded, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nSaved to {PROFILE_BENCHMARKS_FILE}")
+
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark render profiles")
+    parser.add_argument("profiles", nargs="*", help="profiles to benchmark (default: all)")
+    parser.add_argument("--cold", action="store_true", help="render with an empty LaTeX cache")
+    args = parser.parse_args()
+
+    names = args.profiles or list(RENDER_PROFILES)
+    unknown = [name for name in names if name not in RENDER_PROFILES]
+    if unknown:
+        print(f"Unknown profiles: {', '.join(unknown)}")
+        sys.exit(2)
+    sys.exit(main(names, args.cold))
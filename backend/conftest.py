@@ -0,0 +1,2 @@
+# test_scene.py is a manual Gemini API check, not a test module
+collect_ignore = ["test_scene.py"]
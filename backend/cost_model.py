@@ -0,0 +1,229 @@
+"""
+Render cost prediction.
+
+Estimates how long a scene will take to render before it runs, so the job
+queue can hand out the shortest jobs first. Static features come from the
+scene's AST and the render profile; a ridge regression fitted on past render
+timings from the metadata store turns them into seconds. Until enough history
+exists the hand-tuned PRIOR_COEFFICIENTS are used.
+"""
+import ast
+import json
+import re
+import threading
+import time
+
+# Frame size and rate behind Manim's -q presets
+QUALITY_PRESETS = {
+    "l": (854, 480, 15),
+    "m": (1280, 720, 30),
+    "h": (1920, 1080, 60),
+    "p": (2560, 1440, 60),
+    "k": (3840, 2160, 60)
+}
+BASELINE_PIXEL_RATE = 854 * 480 * 15
+
+TEX_CLASSES = {"MathTex", "Tex", "SingleStringMathTex"}
+THREE_D_CLASSES = {"ThreeDScene", "ThreeDAxes", "Surface", "Sphere", "Cube", "Prism"}
+DEFAULT_PLAY_SECONDS = 1.0
+DEFAULT_WAIT_SECONDS = 1.0
+DEFAULT_LOOP_ITERATIONS = 3  # Loops over something we cannot count statically
+
+FEATURE_NAMES = (
+    "intercept",
+    "scaled_scene_seconds",
+    "animation_count",
+    "tex_count",
+    "three_d",
+    "pixel_scale"
+)
+
+# seconds = sum(coefficient * feature); a rough fit of -ql renders of the templates
+PRIOR_COEFFICIENTS = (2.5, 0.6, 0.1, 0.8, 6.0, 1.0)
+
+class _SceneVisitor(ast.NodeVisitor):
+    """Count animations, scheduled seconds and expensive mobjects in a scene"""
+
+    def __init__(self):
+        self.animation_count = 0
+        self.scene_seconds = 0.0
+        self.tex_count = 0
+        self.three_d = False
+        self.multiplier = 1
+
+    def visit_ClassDef(self, node):
+        for base in node.bases:
+            if isinstance(base, ast.Name) and base.id in THREE_D_CLASSES:
+                self.three_d = True
+        self.generic_visit(node)
+
+    def visit_For(self, node):
+        length = _static_length(node.iter)
+        iterations = DEFAULT_LOOP_ITERATIONS if length is None else length
+        outer_multiplier = self.multiplier
+        self.multiplier *= iterations
+        for child in node.body:
+            self.visit(child)
+        self.multiplier = outer_multiplier
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_Call(self, node):
+        name = _call_name(node.func)
+        if name == "play":
+            self.animation_count += self.multiplier
+            self.scene_seconds += self.multiplier * _keyword_number(node, "run_time", DEFAULT_PLAY_SECONDS)
+        elif name == "wait":
+            duration = _number(node.args[0]) if node.args else None
+            if duration is None:
+                duration = _keyword_number(node, "duration", DEFAULT_WAIT_SECONDS)
+            self.scene_seconds += self.multiplier * duration
+        elif name in TEX_CLASSES:
+            self.tex_count += self.multiplier
+        elif name in THREE_D_CLASSES:
+            self.three_d = True
+        self.generic_visit(node)
+
+def _call_name(func):
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+def _number(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return float(node.value)
+    return None
+
+def _keyword_number(call, name, default):
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            value = _number(keyword.value)
+            return default if value is None else value
+    return default
+
+def _static_length(node):
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return len(node.elts)
+    if isinstance(node, ast.Call) and _call_name(node.func) == "range":
+        bounds = [_number(arg) for arg in node.args]
+        if bounds and None not in bounds:
+            try:
+                return len(range(*(int(bound) for bound in bounds)))
+            except ValueError:
+                return None
+    return None
+
+def profile_pixel_scale(profile):
+    """Pixels per second of a profile relative to Manim's -ql preset"""
+    width, height, fps = QUALITY_PRESETS.get(profile["quality"], QUALITY_PRESETS["l"])
+    if profile.get("resolution"):
+        width, height = profile["resolution"]
+    if profile.get("fps"):
+        fps = profile["fps"]
+    return width * height * fps / BASELINE_PIXEL_RATE
+
+def extract_features(manim_code, profile):
+    """Static cost features of a scene rendered with a profile"""
+    visitor = _SceneVisitor()
+    try:
+        visitor.visit(ast.parse(manim_code))
+    except SyntaxError:
+        # The worker will fall back to a tiny scene; count what a regex can see
+        visitor.animation_count = len(re.findall(r"\.play\(", manim_code))
+        visitor.scene_seconds = visitor.animation_count * DEFAULT_PLAY_SECONDS
+        visitor.tex_count = len(re.findall(r"\b(?:Math)?Tex\(", manim_code))
+        visitor.three_d = "ThreeDScene" in manim_code
+
+    pixel_scale = profile_pixel_scale(profile)
+    return {
+        "animation_count": visitor.animation_count,
+        "scene_seconds": visitor.scene_seconds,
+        "tex_count": visitor.tex_count,
+        "three_d": int(visitor.three_d),
+        "pixel_scale": pixel_scale
+    }
+
+def feature_vector(features):
+    return (
+        1.0,
+        features["scene_seconds"] * features["pixel_scale"],
+        features["animation_count"],
+        features["tex_count"],
+        features["three_d"],
+        features["pixel_scale"]
+    )
+
+def _solve(matrix, vector):
+    """Solve a small dense linear system by Gaussian elimination with pivoting"""
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * size
+    for r in reversed(range(size)):
+        solution[r] = (rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))) / rows[r][r]
+    return solution
+
+def fit_ridge(samples, ridge=1.0):
+    """Least-squares fit of seconds = coefficients . features, shrunk toward the prior"""
+    size = len(FEATURE_NAMES)
+    # Minimizing |Xw - y|^2 + ridge * |w - prior|^2 keeps sparse features sane
+    gram = [[ridge if i == j else 0.0 for j in range(size)] for i in range(size)]
+    moment = [ridge * prior for prior in PRIOR_COEFFICIENTS]
+    for features, seconds in samples:
+        x = feature_vector(features)
+        for i in range(size):
+            moment[i] += x[i] * seconds
+            for j in range(size):
+                gram[i][j] += x[i] * x[j]
+    return tuple(_solve(gram, moment))
+
+class CostModel:
+    """Render-time predictor refitted lazily from the metadata store"""
+
+    def __init__(self, metadata_store, min_samples=10, refit_seconds=300, max_samples=2000):
+        self.metadata_store = metadata_store
+        self.min_samples = min_samples
+        self.refit_seconds = refit_seconds
+        self.max_samples = max_samples
+        self.coefficients = PRIOR_COEFFICIENTS
+        self.sample_count = 0
+        self.fitted_at = None
+        self._lock = threading.Lock()
+
+    def refit(self):
+        """Fit on recent finished renders; keep the prior if there are too few"""
+        samples = [
+            (json.loads(row["features"]), row["render_seconds"])
+            for row in self.metadata_store.timing_samples(self.max_samples)
+        ]
+        with self._lock:
+            self.fitted_at = time.time()
+            self.sample_count = len(samples)
+            self.coefficients = fit_ridge(samples) if len(samples) >= self.min_samples else PRIOR_COEFFICIENTS
+
+    def predict(self, features):
+        """Predicted render seconds for a feature dict"""
+        if self.fitted_at is None or time.time() - self.fitted_at > self.refit_seconds:
+            try:
+                self.refit()
+            except Exception as e:
+                print(f"Cost model refit failed: {e}")
+                self.fitted_at = time.time()
+        seconds = sum(c * x for c, x in zip(self.coefficients, feature_vector(features)))
+        return max(seconds, 0.1)
+
+    def describe(self):
+        return {
+            "coefficients": dict(zip(FEATURE_NAMES, self.coefficients)),
+            "sample_count": self.sample_count,
+            "using_prior": self.coefficients == PRIOR_COEFFICIENTS,
+            "fitted_at": self.fitted_at
+        }
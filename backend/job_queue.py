@@ -0,0 +1,268 @@
+"""
+Render job queue.
+
+The web tier enqueues render jobs and workers (see worker.py) claim them with
+a time-limited lease that they keep alive with heartbeats. A lease that is not
+renewed in time is reclaimed and the job goes back on the queue, so a crashed
+worker never strands a job.
+
+SQLiteJobBroker covers single-host setups (web process and workers sharing
+one disk). Other brokers implement the JobBroker interface and are selected
+with JOB_BROKER="module:ClassName".
+"""
+import abc
+import importlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class PermanentJobError(Exception):
+    """A job failure retrying will not fix; workers fail the job outright
+
+    Any other exception a render raises is treated as transient and the job
+    is released for another attempt while it has attempts left.
+    """
+
+# ------------------ Broker Interface ------------------
+class JobBroker(abc.ABC):
+    """Interface every job broker implements"""
+
+    @abc.abstractmethod
+    def enqueue(self, payload, job_id=None, predicted_seconds=None):
+        """Add a job (optionally with a chosen id and predicted cost) and return its id"""
+
+    @abc.abstractmethod
+    def claim(self, worker_id, lease_seconds):
+        """Lease the cheapest queued job (after aging) to a worker; return it or None"""
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        """Extend a lease; return False if the worker no longer holds it"""
+
+    @abc.abstractmethod
+    def complete(self, job_id, worker_id, result):
+        """Mark a leased job done; return False if the lease was lost"""
+
+    @abc.abstractmethod
+    def fail(self, job_id, worker_id, error):
+        """Mark a leased job failed; return False if the lease was lost"""
+
+    @abc.abstractmethod
+    def release(self, job_id, worker_id, error):
+        """Give up a leased job after a transient error: requeue it while it has
+        attempts left, otherwise fail it; return False if the lease was lost"""
+
+    @abc.abstractmethod
+    def get(self, job_id):
+        """Return the job dict, or None if it does not exist"""
+
+    @abc.abstractmethod
+    def reclaim_stale(self):
+        """Requeue (or fail) jobs whose lease expired; return how many"""
+
+# ------------------ SQLite Broker ------------------
+class SQLiteJobBroker(JobBroker):
+    """Durable job queue in a single SQLite file"""
+
+    def __init__(self, path, max_attempts=3, aging_rate=1.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.aging_rate = aging_rate
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("predicted_seconds", "priority"):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} REAL")
+
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_priority ON jobs (status, priority)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs (status, lease_expires)")
+
+    @contextmanager
+    def _connect(self):
+        # One connection per call keeps the broker safe to share between threads;
+        # autocommit mode lets _transaction() take the write lock up front.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["error"] = json.loads(job["error"]) if job["error"] else None
+        return job
+
+    def _reclaim(self, conn, now):
+        failed = conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires = NULL, "
+            "finished_at = ?, error = ? "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, now, json.dumps({"error": "Render worker lost its lease too many times"}),
+             RUNNING, now, self.max_attempts)
+        ).rowcount
+        requeued = conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires = NULL "
+            "WHERE status = ? AND lease_expires < ?",
+            (QUEUED, RUNNING, now)
+        ).rowcount
+        return failed + requeued
+
+    def enqueue(self, payload, job_id=None, predicted_seconds=None):
+        job_id = job_id or uuid.uuid4().hex[:8]
+        now = time.time()
+        # Shortest predicted job first, with aging: a job waiting t seconds ranks
+        # as if it were aging_rate * t seconds cheaper. Ranking by
+        # predicted - rate * (now - created) is the same as ranking by
+        # predicted + rate * created, which does not change and can be indexed.
+        priority = (predicted_seconds or 0.0) + self.aging_rate * now
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, predicted_seconds, priority) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), now, predicted_seconds, priority)
+            )
+        return job_id
+
+    def claim(self, worker_id, lease_seconds):
+        now = time.time()
+        with self._transaction() as conn:
+            self._reclaim(conn, now)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY priority, created_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now + lease_seconds, now, row["id"])
+            )
+            return self._row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (time.time() + lease_seconds, job_id, worker_id, RUNNING)
+            ).rowcount
+        return updated == 1
+
+    def _finish(self, job_id, worker_id, status, column, value):
+        with self._connect() as conn:
+            updated = conn.execute(
+                f"UPDATE jobs SET status = ?, {column} = ?, finished_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker_id = ? AND status = ?",
+                (status, json.dumps(value), time.time(), job_id, worker_id, RUNNING)
+            ).rowcount
+        return updated == 1
+
+    def complete(self, job_id, worker_id, result):
+        return self._finish(job_id, worker_id, DONE, "result", result)
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, FAILED, "error", error)
+
+    def release(self, job_id, worker_id, error):
+        now = time.time()
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END, "
+                "error = ?, worker_id = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker_id = ? AND status = ?",
+                (self.max_attempts, FAILED, QUEUED, self.max_attempts, now,
+                 json.dumps(error), job_id, worker_id, RUNNING)
+            ).rowcount
+        return updated == 1
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def reclaim_stale(self):
+        with self._transaction() as conn:
+            return self._reclaim(conn, time.time())
+
+# ------------------ Artifact Storage ------------------
+class ArtifactStorage(abc.ABC):
+    """Interface for the shared storage workers upload results to"""
+
+    @abc.abstractmethod
+    def put(self, local_path, name):
+        """Store a local file under name"""
+
+class LocalStorage(ArtifactStorage):
+    """Directory storage; point every node at the same mount to share it"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, local_path, name):
+        destination = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Copy under a temporary name first so readers never see a partial file
+        partial_path = f"{destination}.{uuid.uuid4().hex[:8]}.part"
+        shutil.copy(local_path, partial_path)
+        os.replace(partial_path, destination)
+        return name
+
+# ------------------ Factory ------------------
+def create_broker(default_path):
+    """Create the broker selected by JOB_BROKER (default: SQLite at JOB_DB_PATH)"""
+    broker = os.getenv("JOB_BROKER", "sqlite")
+    max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    aging_rate = float(os.getenv("JOB_AGING_RATE", "1.0"))
+
+    if broker == "sqlite":
+        return SQLiteJobBroker(os.getenv("JOB_DB_PATH", default_path),
+                               max_attempts=max_attempts, aging_rate=aging_rate)
+
+    module_name, _, class_name = broker.partition(":")
+    broker_class = getattr(importlib.import_module(module_name), class_name)
+    return broker_class()
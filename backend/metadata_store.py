@@ -0,0 +1,198 @@
+"""
+Render metadata store.
+
+Keeps one row per generation request (prompt, hashes, profile, timings,
+output size and outcome) in an embedded SQLite database, indexed on the
+columns lookups filter by. The history API and the render cache read from it
+instead of scanning VIDEO_FOLDER.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+HISTORY_COLUMNS = (
+    "job_id", "created_at", "prompt", "prompt_hash", "code_hash", "profile",
+    "status", "cached", "generation_seconds", "queue_seconds", "render_seconds",
+    "file_size", "video_name", "error", "video_seconds", "poster_name", "sprite_name",
+    "features", "predicted_seconds", "tex_cache_hits", "tex_cache_misses", "fell_back"
+)
+
+# Columns added after the first release, with their types; existing databases
+# gain them on startup
+ADDED_COLUMNS = {
+    "video_seconds": "REAL",
+    "poster_name": "TEXT",
+    "sprite_name": "TEXT",
+    "features": "TEXT",
+    "predicted_seconds": "REAL",
+    "tex_cache_hits": "INTEGER",
+    "tex_cache_misses": "INTEGER",
+    "fell_back": "INTEGER"
+}
+
+def normalize_prompt(prompt):
+    """Lowercase and collapse whitespace so trivially different prompts match"""
+    return " ".join(prompt.lower().split())
+
+def prompt_hash(prompt):
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+def code_hash(manim_code):
+    return hashlib.sha256(manim_code.strip().encode("utf-8")).hexdigest()
+
+class MetadataStore:
+    """SQLite-backed record of every render request"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS renders (
+                    job_id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    prompt TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    code_hash TEXT NOT NULL,
+                    profile TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    cached INTEGER NOT NULL DEFAULT 0,
+                    generation_seconds REAL,
+                    queue_seconds REAL,
+                    render_seconds REAL,
+                    file_size INTEGER,
+                    video_name TEXT,
+                    error TEXT
+                )
+            """)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(renders)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE renders ADD COLUMN {column} {column_type}")
+
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_renders_created ON renders (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_renders_status_created ON renders (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_renders_prompt_hash ON renders (prompt_hash, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_renders_code_hash ON renders (code_hash, profile, status)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def record_request(self, job_id, prompt, manim_code, profile, status, cached=False, **fields):
+        """Record a new generation request; fields fill any other columns"""
+        self._check_columns(fields)
+        row = {
+            "job_id": job_id,
+            "created_at": time.time(),
+            "prompt": prompt,
+            "prompt_hash": prompt_hash(prompt),
+            "code_hash": code_hash(manim_code),
+            "profile": profile,
+            "status": status,
+            "cached": int(cached),
+            **fields
+        }
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO renders ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                tuple(row.values())
+            )
+
+    def _check_columns(self, fields):
+        unknown = set(fields) - set(HISTORY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown metadata columns: {', '.join(sorted(unknown))}")
+
+    def update(self, job_id, **fields):
+        """Update columns of an existing request (status, timings, output)"""
+        self._check_columns(fields)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE renders SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM renders WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def history(self, page=1, per_page=20, status=None):
+        """Return (rows, total) for one page, newest first"""
+        where, params = ("WHERE status = ?", [status]) if status else ("", [])
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM renders {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM renders {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*params, per_page, (page - 1) * per_page)
+            ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def unfinished(self, limit=500):
+        """Oldest rendering requests still queued or running"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM renders WHERE status IN ('queued', 'running') AND cached = 0 "
+                "ORDER BY created_at LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_by_hash(self, value, limit=50):
+        """Rows whose prompt hash or code hash equals value, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM renders WHERE prompt_hash = ? "
+                "UNION SELECT * FROM renders WHERE code_hash = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (value, value, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def timing_samples(self, limit):
+        """Features and render time of recent real renders, for fitting the cost model
+
+        Fallback renders are left out: their timing is the placeholder scene's,
+        not the submitted code's the features describe.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT features, render_seconds FROM renders "
+                "WHERE status = 'done' AND cached = 0 AND fell_back = 0 AND features IS NOT NULL "
+                "AND render_seconds IS NOT NULL ORDER BY created_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prediction_pairs(self, limit):
+        """Predicted vs. actual render time of recent finished renders, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, created_at, profile, predicted_seconds, render_seconds FROM renders "
+                "WHERE status = 'done' AND cached = 0 AND fell_back = 0 AND predicted_seconds IS NOT NULL "
+                "AND render_seconds IS NOT NULL ORDER BY created_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_completed_render(self, manim_code, profile):
+        """Newest finished, non-cached render of this exact code and profile
+
+        Renders that fell back to the placeholder scene do not count: their
+        video does not show the submitted code.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM renders WHERE code_hash = ? AND profile = ? AND status = 'done' "
+                "AND cached = 0 AND fell_back = 0 ORDER BY created_at DESC LIMIT 1",
+                (code_hash(manim_code), profile)
+            ).fetchone()
+        return dict(row) if row else None
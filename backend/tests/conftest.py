@@ -0,0 +1,21 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Tests import the backend modules the same way app.py and worker.py do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing app opens its job queue, metadata store and LaTeX cache; keep them
+# out of the real data folder (set explicitly so .env cannot override them)
+_scratch = tempfile.mkdtemp(prefix="manim_tests_")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ.update({
+    "DATA_FOLDER": _scratch,
+    "VIDEO_FOLDER": os.path.join(_scratch, "videos"),
+    "JOB_BROKER": "sqlite",
+    "JOB_DB_PATH": os.path.join(_scratch, "jobs.db"),
+    "METADATA_DB_PATH": os.path.join(_scratch, "metadata.db"),
+    "TEX_CACHE_DIR": os.path.join(_scratch, "tex_cache")
+})
@@ -0,0 +1,117 @@
+import itertools
+
+import pytest
+
+from cost_model import (
+    DEFAULT_LOOP_ITERATIONS,
+    PRIOR_COEFFICIENTS,
+    extract_features,
+    feature_vector,
+    fit_ridge,
+)
+
+LOW_QUALITY = {"quality": "l", "resolution": None, "fps": None}
+
+def scene(body):
+    lines = ["from manim import *", "", "class Demo(Scene):", "    def construct(self):"]
+    lines += [f"        {line}" for line in body.strip().splitlines()]
+    return "\n".join(lines) + "\n"
+
+# ------------------ extract_features ------------------
+def test_counts_plays_waits_and_run_times():
+    features = extract_features(scene("""
+circle = Circle()
+self.play(Create(circle))
+self.play(FadeOut(circle), run_time=2.5)
+self.wait()
+self.wait(0.5)
+"""), LOW_QUALITY)
+
+    assert features["animation_count"] == 2
+    assert features["scene_seconds"] == pytest.approx(1.0 + 2.5 + 1.0 + 0.5)
+    assert features["tex_count"] == 0
+    assert features["three_d"] == 0
+    assert features["pixel_scale"] == pytest.approx(1.0)
+
+def test_loops_multiply_their_body():
+    features = extract_features(scene("""
+for i in range(4):
+    for shape in [Circle(), Square()]:
+        self.play(Create(shape))
+    self.wait()
+self.play(Write(MathTex("x")))
+"""), LOW_QUALITY)
+
+    assert features["animation_count"] == 4 * 2 + 1
+    assert features["scene_seconds"] == pytest.approx(4 * 2 + 4 + 1)
+    assert features["tex_count"] == 1
+
+def test_empty_loops_count_zero_iterations():
+    features = extract_features(scene("""
+for i in range(0):
+    self.play(Write(MathTex("x")))
+for item in []:
+    self.wait(10)
+self.wait()
+"""), LOW_QUALITY)
+
+    assert features["animation_count"] == 0
+    assert features["tex_count"] == 0
+    assert features["scene_seconds"] == pytest.approx(1.0)
+
+def test_unknown_iterables_use_default_iteration_count():
+    features = extract_features(scene("""
+for item in items:
+    self.play(FadeIn(item))
+"""), LOW_QUALITY)
+
+    assert features["animation_count"] == DEFAULT_LOOP_ITERATIONS
+
+def test_detects_three_d_scenes():
+    code = scene("self.play(Create(Sphere()))").replace("(Scene)", "(ThreeDScene)")
+
+    assert extract_features(code, LOW_QUALITY)["three_d"] == 1
+
+def test_pixel_scale_follows_profile_overrides():
+    profile = {"quality": "m", "resolution": [854, 480], "fps": 30}
+
+    assert extract_features(scene("self.wait()"), profile)["pixel_scale"] == pytest.approx(2.0)
+
+def test_unparseable_code_falls_back_to_regex_counts():
+    features = extract_features("self.play(Write(MathTex('x')))\nself.play(\n", LOW_QUALITY)
+
+    assert features["animation_count"] == 2
+    assert features["tex_count"] == 1
+
+# ------------------ fit_ridge ------------------
+def make_features(scene_seconds, animation_count, tex_count, three_d, pixel_scale):
+    return {
+        "scene_seconds": scene_seconds,
+        "animation_count": animation_count,
+        "tex_count": tex_count,
+        "three_d": three_d,
+        "pixel_scale": pixel_scale
+    }
+
+def predict(coefficients, features):
+    return sum(c * x for c, x in zip(coefficients, feature_vector(features)))
+
+def test_fit_ridge_without_samples_returns_prior():
+    assert fit_ridge([]) == pytest.approx(PRIOR_COEFFICIENTS)
+
+def test_fit_ridge_recovers_coefficients_from_clean_samples():
+    true_coefficients = (1.0, 0.3, 0.5, 2.0, 4.0, 0.5)
+    samples = []
+    for values in itertools.product((1, 5, 12), (1, 4, 9), (0, 2, 6), (0, 1), (1.0, 2.25)):
+        features = make_features(*values)
+        samples.append((features, predict(true_coefficients, features)))
+
+    assert fit_ridge(samples, ridge=1e-6) == pytest.approx(true_coefficients, abs=1e-3)
+
+def test_fit_ridge_shrinks_toward_prior_with_few_samples():
+    features = make_features(10, 5, 0, 0, 1.0)
+    samples = [(features, 100.0)]
+
+    coefficients = fit_ridge(samples, ridge=1e6)
+
+    assert coefficients == pytest.approx(PRIOR_COEFFICIENTS, abs=1e-2)
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+import job_queue
+from job_queue import FAILED, QUEUED, RUNNING, SQLiteJobBroker
+
+@pytest.fixture
+def broker(tmp_path):
+    return SQLiteJobBroker(str(tmp_path / "jobs.db"), max_attempts=3, aging_rate=0.0)
+
+def test_claim_takes_cheapest_predicted_job_first(broker):
+    broker.enqueue({"n": 1}, job_id="slow", predicted_seconds=30)
+    broker.enqueue({"n": 2}, job_id="fast", predicted_seconds=2)
+    broker.enqueue({"n": 3}, job_id="medium", predicted_seconds=10)
+
+    claimed = [broker.claim("w", 60)["id"] for _ in range(3)]
+
+    assert claimed == ["fast", "medium", "slow"]
+    assert broker.claim("w", 60) is None
+
+def test_claim_ages_waiting_jobs_ahead_of_cheaper_new_ones(tmp_path, monkeypatch):
+    broker = SQLiteJobBroker(str(tmp_path / "jobs.db"), aging_rate=1.0)
+    now = time.time()
+
+    monkeypatch.setattr(job_queue.time, "time", lambda: now - 100)
+    broker.enqueue({}, job_id="old", predicted_seconds=50)
+    monkeypatch.setattr(job_queue.time, "time", lambda: now)
+    broker.enqueue({}, job_id="new", predicted_seconds=5)
+
+    # 100 seconds of waiting outweighs the 45 second difference in cost
+    assert broker.claim("w", 60)["id"] == "old"
+
+def test_claim_leases_job_to_worker(broker):
+    broker.enqueue({"prompt": "circle"}, job_id="a")
+
+    job = broker.claim("worker-1", 60)
+
+    assert job["status"] == RUNNING
+    assert job["worker_id"] == "worker-1"
+    assert job["attempts"] == 1
+    assert job["payload"] == {"prompt": "circle"}
+
+def test_reclaim_requeues_expired_lease_then_fails_after_max_attempts(broker):
+    broker.enqueue({}, job_id="a")
+
+    for attempt in range(1, 3):
+        job = broker.claim("w", -1)  # Lease already expired
+        assert job["attempts"] == attempt
+        assert broker.reclaim_stale() == 1
+        assert broker.get("a")["status"] == QUEUED
+
+    broker.claim("w", -1)
+    assert broker.reclaim_stale() == 1
+
+    job = broker.get("a")
+    assert job["status"] == FAILED
+    assert job["attempts"] == 3
+    assert "lost its lease" in job["error"]["error"]
+    assert broker.claim("w", 60) is None
+
+def test_reclaim_leaves_live_leases_alone(broker):
+    broker.enqueue({}, job_id="a")
+    broker.claim("w", 60)
+
+    assert broker.reclaim_stale() == 0
+    assert broker.get("a")["status"] == RUNNING
+
+def test_reclaimed_job_rejects_old_worker(broker):
+    broker.enqueue({}, job_id="a")
+    broker.claim("old-worker", -1)
+    broker.reclaim_stale()
+    broker.claim("new-worker", 60)
+
+    assert not broker.heartbeat("a", "old-worker", 60)
+    assert not broker.complete("a", "old-worker", {"video_url": "/videos/x.mp4"})
+    assert broker.complete("a", "new-worker", {"video_url": "/videos/y.mp4"})
+    assert broker.get("a")["result"] == {"video_url": "/videos/y.mp4"}
+
+def test_release_requeues_then_fails_after_max_attempts(broker):
+    broker.enqueue({}, job_id="a")
+
+    for _ in range(2):
+        broker.claim("w", 60)
+        assert broker.release("a", "w", {"error": "disk busy"})
+        assert broker.get("a")["status"] == QUEUED
+
+    broker.claim("w", 60)
+    assert broker.release("a", "w", {"error": "disk busy"})
+
+    job = broker.get("a")
+    assert job["status"] == FAILED
+    assert job["error"] == {"error": "disk busy"}
+    assert job["finished_at"] is not None
+
+def test_release_needs_the_lease(broker):
+    broker.enqueue({}, job_id="a")
+    broker.claim("w", 60)
+
+    assert not broker.release("a", "other", {"error": "disk busy"})
+    assert broker.get("a")["status"] == RUNNING
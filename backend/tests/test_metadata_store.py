@@ -0,0 +1,111 @@
+import sqlite3
+import time
+
+import pytest
+
+from metadata_store import ADDED_COLUMNS, MetadataStore, code_hash, prompt_hash
+
+@pytest.fixture
+def store(tmp_path):
+    return MetadataStore(str(tmp_path / "metadata.db"))
+
+def record(store, job_id, prompt="circle", code="code", profile="draft", status="done", **fields):
+    store.record_request(job_id, prompt, code, profile, status, **fields)
+    time.sleep(0.001)  # Keep created_at strictly increasing
+
+def test_history_pages_newest_first(store):
+    for n in range(5):
+        record(store, f"job{n}")
+
+    rows, total = store.history(page=1, per_page=2)
+    assert total == 5
+    assert [row["job_id"] for row in rows] == ["job4", "job3"]
+
+    rows, _ = store.history(page=3, per_page=2)
+    assert [row["job_id"] for row in rows] == ["job0"]
+
+def test_history_filters_by_status(store):
+    record(store, "a", status="done")
+    record(store, "b", status="failed")
+    record(store, "c", status="done")
+
+    rows, total = store.history(status="done")
+
+    assert total == 2
+    assert [row["job_id"] for row in rows] == ["c", "a"]
+
+def test_find_by_hash_matches_prompt_or_code(store):
+    record(store, "a", prompt="Draw a  Circle", code="one")
+    record(store, "b", prompt="something else", code="two")
+    record(store, "c", prompt="third", code="one")
+
+    by_prompt = store.find_by_hash(prompt_hash("draw a circle"))
+    by_code = store.find_by_hash(code_hash("one"))
+
+    assert [row["job_id"] for row in by_prompt] == ["a"]
+    assert [row["job_id"] for row in by_code] == ["c", "a"]
+    assert store.find_by_hash("0" * 64) == []
+
+def test_find_completed_render_skips_fallback_and_cached_rows(store):
+    record(store, "real", fell_back=0, video_name="real.mp4")
+    record(store, "fallback", fell_back=1, video_name="fallback.mp4")
+    record(store, "cached", cached=True, fell_back=0, video_name="real.mp4")
+    record(store, "failed", status="failed", fell_back=0)
+
+    assert store.find_completed_render("code", "draft")["job_id"] == "real"
+    assert store.find_completed_render("code", "final") is None
+
+def test_find_completed_render_ignores_fallback_only_history(store):
+    record(store, "fallback", fell_back=1, video_name="fallback.mp4")
+
+    assert store.find_completed_render("code", "draft") is None
+
+def test_unfinished_lists_queued_and_running_oldest_first(store):
+    record(store, "queued", status="queued")
+    record(store, "running", status="running")
+    record(store, "done", status="done")
+    record(store, "cached", status="queued", cached=True)
+
+    assert [row["job_id"] for row in store.unfinished()] == ["queued", "running"]
+
+def test_update_rejects_unknown_columns(store):
+    record(store, "a")
+
+    with pytest.raises(ValueError):
+        store.update("a", not_a_column=1)
+
+def test_old_schema_gains_added_columns(tmp_path):
+    path = str(tmp_path / "metadata.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE renders (
+            job_id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            prompt TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            code_hash TEXT NOT NULL,
+            profile TEXT NOT NULL,
+            status TEXT NOT NULL,
+            cached INTEGER NOT NULL DEFAULT 0,
+            generation_seconds REAL,
+            queue_seconds REAL,
+            render_seconds REAL,
+            file_size INTEGER,
+            video_name TEXT,
+            error TEXT
+        )
+    """)
+    conn.execute(
+        "INSERT INTO renders (job_id, created_at, prompt, prompt_hash, code_hash, profile, status) "
+        "VALUES ('old', 1.0, 'p', 'ph', 'ch', 'draft', 'done')"
+    )
+    conn.commit()
+    conn.close()
+
+    store = MetadataStore(path)
+
+    row = store.get("old")
+    assert set(ADDED_COLUMNS) <= set(row)
+    assert all(row[column] is None for column in ADDED_COLUMNS)
+    store.update("old", fell_back=0, video_seconds=3.0)
+    assert store.get("old")["video_seconds"] == 3.0
@@ -0,0 +1,107 @@
+import pytest
+
+import app
+from job_queue import DONE, FAILED, QUEUED, RUNNING, SQLiteJobBroker
+from metadata_store import MetadataStore
+
+RESULT = {
+    "manim_code": "code",
+    "video_url": "/videos/animation_a.mp4",
+    "file_size": 2048,
+    "fell_back": False,
+    "tex_cache": {"hits": 3, "misses": 1},
+    "poster_url": "/thumbnails/animation_a_poster.jpg",
+    "sprite_url": "/thumbnails/animation_a_sprite.jpg",
+    "video_seconds": 4.0,
+    "render_seconds": 7.5,
+    "queue_seconds": 0.5
+}
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    broker = SQLiteJobBroker(str(tmp_path / "jobs.db"), max_attempts=2)
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(app, "job_broker", broker)
+    monkeypatch.setattr(app, "metadata_store", store)
+    return broker, store
+
+def submit(broker, store, job_id="a"):
+    store.record_request(job_id, "circle", "code", "draft", QUEUED, predicted_seconds=5.0)
+    broker.enqueue({"prompt": "circle", "manim_code": "code", "profile": "draft"},
+                   job_id=job_id, predicted_seconds=5.0)
+
+def test_finished_job_result_fills_in_the_row(stores):
+    broker, store = stores
+    submit(broker, store)
+    broker.claim("w", 60)
+    broker.complete("a", "w", RESULT)
+
+    [row] = app.reconcile_renders([store.get("a")])
+
+    assert row["status"] == DONE
+    stored = store.get("a")
+    assert stored["video_name"] == "animation_a.mp4"
+    assert stored["file_size"] == 2048
+    assert stored["render_seconds"] == 7.5
+    assert stored["queue_seconds"] == 0.5
+    assert stored["poster_name"] == "animation_a_poster.jpg"
+    assert stored["sprite_name"] == "animation_a_sprite.jpg"
+    assert stored["fell_back"] == 0
+    assert (stored["tex_cache_hits"], stored["tex_cache_misses"]) == (3, 1)
+    assert store.find_completed_render("code", "draft")["job_id"] == "a"
+
+def test_failed_job_records_error(stores):
+    broker, store = stores
+    submit(broker, store)
+    broker.claim("w", 60)
+    broker.fail("a", "w", {"error": "Animation rendering failed", "details": "boom"})
+
+    app.reconcile_renders([store.get("a")])
+
+    stored = store.get("a")
+    assert stored["status"] == FAILED
+    assert stored["error"] == "Animation rendering failed"
+    assert stored["render_seconds"] is not None
+
+def test_reclaimed_job_goes_back_to_queued(stores):
+    broker, store = stores
+    submit(broker, store)
+    store.update("a", status=RUNNING)
+    broker.claim("w", -1)  # Lease already expired
+
+    [row] = app.reconcile_renders([store.get("a")])
+
+    assert row["status"] == QUEUED
+    assert store.get("a")["status"] == QUEUED
+
+def test_job_out_of_attempts_is_failed(stores):
+    broker, store = stores
+    submit(broker, store)
+    for _ in range(2):
+        broker.claim("w", -1)
+        broker.reclaim_stale()
+
+    [row] = app.reconcile_renders([store.get("a")])
+
+    assert row["status"] == FAILED
+    assert "lost its lease" in store.get("a")["error"]
+
+def test_history_and_job_status_reconcile(stores):
+    broker, store = stores
+    submit(broker, store)
+    broker.claim("w", 60)
+    broker.complete("a", "w", RESULT)
+    client = app.app.test_client()
+
+    item = client.get("/history").json["items"][0]
+    assert item["status"] == DONE
+    assert item["video_url"] == "/videos/animation_a.mp4"
+    assert item["fell_back"] is False
+
+    assert client.get("/jobs/a").json["video_url"] == "/videos/animation_a.mp4"
+
+def test_history_rejects_bad_paging(stores):
+    client = app.app.test_client()
+
+    assert client.get("/history?page=0").status_code == 400
+    assert client.get("/history?per_page=x").status_code == 400
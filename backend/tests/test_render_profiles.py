@@ -0,0 +1,158 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+import app
+from app import (
+    DEFAULT_RENDER_PROFILES,
+    build_render_command,
+    finalize_video,
+    load_default_profile,
+    load_render_profiles,
+)
+
+PREVIEW = DEFAULT_RENDER_PROFILES["preview"]
+
+def profile(**settings):
+    return {**PREVIEW, **settings}
+
+# ------------------ build_render_command ------------------
+def test_command_uses_quality_renderer_and_format():
+    cmd = build_render_command("python", "scene.py", "out", profile(quality="m", format="webm"))
+
+    assert cmd[:6] == ["python", "-m", "manim", "render", "scene.py", "GeneratedScene"]
+    assert cmd[cmd.index("--media_dir") + 1] == "out"
+    assert "-qm" in cmd
+    assert cmd[cmd.index("--renderer") + 1] == "cairo"
+    assert cmd[cmd.index("--format") + 1] == "webm"
+    assert "--disable_caching" in cmd
+
+def test_command_leaves_preset_resolution_and_fps_alone_by_default():
+    cmd = build_render_command("python", "scene.py", "out", profile(resolution=None, fps=None))
+
+    assert "-r" not in cmd
+    assert "--fps" not in cmd
+    assert "--write_to_movie" not in cmd
+    assert "--config_file" not in cmd
+
+def test_command_overrides_resolution_and_fps():
+    cmd = build_render_command("python", "scene.py", "out", profile(resolution=[640, 360], fps=24))
+
+    assert cmd[cmd.index("-r") + 1] == "640,360"
+    assert cmd[cmd.index("--fps") + 1] == "24"
+
+def test_opengl_writes_a_movie():
+    cmd = build_render_command("python", "scene.py", "out", profile(renderer="opengl"))
+
+    assert cmd[cmd.index("--renderer") + 1] == "opengl"
+    assert "--write_to_movie" in cmd
+
+def test_command_passes_config_file():
+    cmd = build_render_command("python", "scene.py", "out", PREVIEW, config_file="out/manim.cfg")
+
+    assert cmd[cmd.index("--config_file") + 1] == "out/manim.cfg"
+
+# ------------------ finalize_video ------------------
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "rendered.mp4"
+    path.write_bytes(b"manim output")
+    return str(path), str(tmp_path / "final.mp4")
+
+def fake_ffmpeg(monkeypatch, returncode=0):
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        if returncode == 0:
+            with open(cmd[-1], "wb") as f:
+                f.write(b"re-encoded")
+        return subprocess.CompletedProcess(cmd, returncode, "", "encoder error")
+
+    monkeypatch.setattr(app.subprocess, "run", run)
+    return calls
+
+def test_finalize_copies_without_preset_or_crf(video, monkeypatch):
+    source, destination = video
+    calls = fake_ffmpeg(monkeypatch)
+
+    finalize_video(source, destination, profile(preset=None, crf=None))
+
+    assert calls == []
+    assert open(destination, "rb").read() == b"manim output"
+
+def test_finalize_reencodes_x264_with_preset_and_crf(video, monkeypatch):
+    source, destination = video
+    calls = fake_ffmpeg(monkeypatch)
+
+    finalize_video(source, destination, DEFAULT_RENDER_PROFILES["final"])
+
+    [cmd] = calls
+    assert cmd[cmd.index("-c:v") + 1] == "libx264"
+    assert cmd[cmd.index("-preset") + 1] == "slow"
+    assert cmd[cmd.index("-crf") + 1] == "18"
+    assert "+faststart" in cmd
+    assert open(destination, "rb").read() == b"re-encoded"
+
+def test_finalize_uses_constant_quality_for_vp9(video, monkeypatch):
+    source, destination = video
+    calls = fake_ffmpeg(monkeypatch)
+
+    finalize_video(source, destination, profile(format="webm", crf=32))
+
+    [cmd] = calls
+    assert cmd[cmd.index("-c:v") + 1] == "libvpx-vp9"
+    assert cmd[cmd.index("-b:v") + 1] == "0"
+    assert "-preset" not in cmd
+
+def test_finalize_keeps_manim_output_when_reencode_fails(video, monkeypatch):
+    source, destination = video
+    fake_ffmpeg(monkeypatch, returncode=1)
+
+    finalize_video(source, destination, DEFAULT_RENDER_PROFILES["final"])
+
+    assert open(destination, "rb").read() == b"manim output"
+
+# ------------------ Profile config ------------------
+def write_profiles(tmp_path, monkeypatch, content):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps(content))
+    monkeypatch.setenv("RENDER_PROFILES_FILE", str(path))
+
+def test_profiles_file_overrides_and_adds_profiles(tmp_path, monkeypatch):
+    write_profiles(tmp_path, monkeypatch, {"draft": {"fps": 10}, "social": {"resolution": [1080, 1080]}})
+
+    profiles = load_render_profiles()
+
+    assert profiles["draft"]["fps"] == 10
+    assert profiles["draft"]["quality"] == "l"
+    assert profiles["social"]["resolution"] == [1080, 1080]
+    assert profiles["social"]["timeout"] == PREVIEW["timeout"]
+
+def test_profiles_file_that_is_not_an_object_is_ignored(tmp_path, monkeypatch):
+    write_profiles(tmp_path, monkeypatch, ["draft", "final"])
+
+    assert load_render_profiles() == DEFAULT_RENDER_PROFILES
+
+def test_profiles_file_skips_entries_that_are_not_objects(tmp_path, monkeypatch):
+    write_profiles(tmp_path, monkeypatch, {"draft": "fast", "final": None, "social": {"fps": 24}})
+
+    profiles = load_render_profiles()
+
+    assert profiles["draft"] == DEFAULT_RENDER_PROFILES["draft"]
+    assert profiles["final"] == DEFAULT_RENDER_PROFILES["final"]
+    assert profiles["social"]["fps"] == 24
+
+def test_unreadable_profiles_file_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setenv("RENDER_PROFILES_FILE", os.path.join(str(tmp_path), "missing.json"))
+
+    assert load_render_profiles() == DEFAULT_RENDER_PROFILES
+
+def test_unknown_default_profile_falls_back_to_preview(monkeypatch):
+    monkeypatch.setenv("DEFAULT_RENDER_PROFILE", "ultra")
+    assert load_default_profile(DEFAULT_RENDER_PROFILES) == "preview"
+
+    monkeypatch.setenv("DEFAULT_RENDER_PROFILE", "final")
+    assert load_default_profile(DEFAULT_RENDER_PROFILES) == "final"
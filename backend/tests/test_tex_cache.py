@@ -0,0 +1,157 @@
+import os
+import time
+
+import pytest
+
+from tex_cache import INDEX_DIR, JOB_DIRS, MAX_INDEXED_SVGS, TexCache, tex_expressions
+
+@pytest.fixture
+def cache(tmp_path):
+    return TexCache(str(tmp_path / "tex_cache"), max_bytes=10_000)
+
+def tex_source(expression):
+    """Roughly what Manim writes for an expression: its strings inside a template"""
+    return ("\\documentclass{standalone}\n\\begin{document}\n\\begin{align*}\n"
+            + " ".join(expression[1]) + "\n\\end{align*}\n\\end{document}\n")
+
+def compile_tex(tex_dir, name, expression=("MathTex", ("x",)), size=100):
+    """Write what Manim leaves behind for one compiled expression: .tex and .svg"""
+    with open(os.path.join(tex_dir, f"{name}.tex"), "w") as f:
+        f.write(tex_source(expression))
+    with open(os.path.join(tex_dir, f"{name}.svg"), "wb") as f:
+        f.write(b"x" * size)
+
+def use_cached_tex(tex_dir, name, expression=("MathTex", ("x",))):
+    """Manim still writes the .tex source when the SVG is already there"""
+    with open(os.path.join(tex_dir, f"{name}.tex"), "w") as f:
+        f.write(tex_source(expression))
+
+PYTHAGORAS = ("MathTex", ("a^2 + b^2 = c^2",))
+EULER = ("MathTex", ("e^{i\\pi} + 1 = 0",))
+
+def render(cache, job_id, expressions, compiled=(), used=()):
+    """One render: prepare, compile/use the named SVGs, publish, release"""
+    tex_dir, seeded = cache.prepare(job_id, expressions)
+    for name, expression in compiled:
+        compile_tex(tex_dir, name, expression)
+    for name, expression in used:
+        use_cached_tex(tex_dir, name, expression)
+    stats = cache.publish(tex_dir, seeded, expressions)
+    cache.release(tex_dir)
+    return seeded, stats
+
+def test_first_render_misses_and_publishes(cache):
+    seeded, stats = render(cache, "job1", [PYTHAGORAS, EULER],
+                           compiled=[("a", PYTHAGORAS), ("b", EULER)])
+
+    assert seeded == set()
+    assert stats == {"hits": 0, "misses": 2, "seeded": 0}
+    assert os.path.exists(os.path.join(cache.root, "a.svg"))
+    assert cache.stats()["entries"] == 2
+
+def test_later_render_seeds_and_hits_its_expressions(cache):
+    render(cache, "job1", [PYTHAGORAS], compiled=[("a", PYTHAGORAS)])
+
+    tex_dir, seeded = cache.prepare("job2", [PYTHAGORAS, EULER])
+    assert seeded == {"a.svg"}
+    assert os.path.exists(os.path.join(tex_dir, "a.svg"))
+
+    use_cached_tex(tex_dir, "a", PYTHAGORAS)
+    compile_tex(tex_dir, "b", EULER)
+
+    assert cache.publish(tex_dir, seeded, [PYTHAGORAS, EULER]) == {"hits": 1, "misses": 1, "seeded": 1}
+
+def test_prepare_seeds_only_the_scenes_expressions(cache):
+    render(cache, "job1", [PYTHAGORAS, EULER], compiled=[("a", PYTHAGORAS), ("b", EULER)])
+
+    tex_dir, seeded = cache.prepare("job2", [EULER])
+
+    assert seeded == {"b.svg"}
+    assert sorted(os.listdir(tex_dir)) == ["b.svg"]
+    assert cache.prepare("job3")[1] == set()
+
+def test_seeded_svgs_that_were_not_used_do_not_count(cache):
+    render(cache, "job1", [PYTHAGORAS], compiled=[("a", PYTHAGORAS)])
+
+    seeded, stats = render(cache, "job2", [PYTHAGORAS])
+
+    assert seeded == {"a.svg"}
+    assert stats == {"hits": 0, "misses": 0, "seeded": 1}
+
+def test_index_is_capped_per_expression(cache):
+    for n in range(MAX_INDEXED_SVGS + 3):
+        render(cache, f"job{n}", [PYTHAGORAS], compiled=[(f"svg{n:02d}", PYTHAGORAS)])
+
+    _, seeded = cache.prepare("last", [PYTHAGORAS])
+
+    assert len(seeded) == MAX_INDEXED_SVGS
+    assert f"svg{MAX_INDEXED_SVGS + 2:02d}.svg" in seeded
+    assert "svg00.svg" not in seeded
+
+def test_release_removes_job_dir(cache):
+    tex_dir, _ = cache.prepare("job1")
+
+    cache.release(tex_dir)
+
+    assert not os.path.exists(tex_dir)
+
+def test_evict_removes_least_recently_used_down_to_limit(cache):
+    now = time.time()
+    for age, name in enumerate(["newest", "middle", "oldest"]):
+        path = os.path.join(cache.root, f"{name}.svg")
+        with open(path, "wb") as f:
+            f.write(b"x" * 4_000)
+        os.utime(path, (now - age * 60, now - age * 60))
+
+    # 12 000 bytes against a 10 000 limit: dropping the oldest gets under 9 000
+    cache.evict()
+
+    assert sorted(os.listdir(cache.root)) == sorted([INDEX_DIR, JOB_DIRS, "middle.svg", "newest.svg"])
+
+def test_publish_evicts_and_prunes_index_when_over_limit(tmp_path):
+    cache = TexCache(str(tmp_path / "tex_cache"), max_bytes=250)
+    render(cache, "job1", [PYTHAGORAS], compiled=[("old", PYTHAGORAS)])
+    old = os.path.join(cache.root, "old.svg")
+    os.utime(old, (time.time() - 60, time.time() - 60))
+
+    tex_dir, seeded = cache.prepare("job2", [EULER])
+    compile_tex(tex_dir, "new", EULER, size=200)
+    cache.publish(tex_dir, seeded, [EULER])
+
+    assert not os.path.exists(old)
+    assert os.path.exists(os.path.join(cache.root, "new.svg"))
+    assert len(os.listdir(os.path.join(cache.root, INDEX_DIR))) == 1
+    assert cache.prepare("job3", [PYTHAGORAS])[1] == set()
+
+def test_hit_marks_svg_recently_used(cache):
+    render(cache, "job1", [PYTHAGORAS], compiled=[("a", PYTHAGORAS)])
+    cached = os.path.join(cache.root, "a.svg")
+    os.utime(cached, (time.time() - 3600, time.time() - 3600))
+
+    render(cache, "job2", [PYTHAGORAS], used=[("a", PYTHAGORAS)])
+
+    assert os.stat(cached).st_mtime > time.time() - 60
+
+def test_evict_removes_stale_job_dirs(cache):
+    stale_dir, _ = cache.prepare("crashed")
+    live_dir, _ = cache.prepare("running")
+    os.utime(stale_dir, (time.time() - 2 * 24 * 3600,) * 2)
+
+    cache.evict()
+
+    assert not os.path.exists(stale_dir)
+    assert os.path.exists(live_dir)
+
+def test_tex_expressions_lists_literal_tex_once():
+    code = (
+        "from manim import *\n"
+        "class S(Scene):\n"
+        "    def construct(self):\n"
+        "        a = MathTex('a^2', '+', 'b^2')\n"
+        "        b = Tex('hello')\n"
+        "        c = MathTex(f'{n}')\n"
+        "        d = MathTex('a^2', '+', 'b^2')\n"
+    )
+
+    assert tex_expressions(code) == [("MathTex", ("a^2", "+", "b^2")), ("Tex", ("hello",))]
+    assert tex_expressions("def broken(:") == []
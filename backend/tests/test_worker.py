@@ -0,0 +1,51 @@
+import pytest
+
+from job_queue import FAILED, QUEUED, PermanentJobError, SQLiteJobBroker
+from worker import RenderWorker
+
+@pytest.fixture
+def broker(tmp_path):
+    broker = SQLiteJobBroker(str(tmp_path / "jobs.db"), max_attempts=2)
+    broker.enqueue({"manim_code": "code"}, job_id="a")
+    return broker
+
+def run_once(broker, render):
+    worker = RenderWorker(broker, render, worker_id="w")
+    worker.run_job(broker.claim("w", 60))
+
+def test_permanent_error_fails_the_job(broker):
+    def render(job, cancelled):
+        raise PermanentJobError("bad scene")
+
+    run_once(broker, render)
+
+    job = broker.get("a")
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+
+def test_transient_error_requeues_until_out_of_attempts(broker):
+    def render(job, cancelled):
+        raise OSError("shared mount went away")
+
+    run_once(broker, render)
+    assert broker.get("a")["status"] == QUEUED
+
+    run_once(broker, render)
+    job = broker.get("a")
+    assert job["status"] == FAILED
+    assert "shared mount went away" in job["error"]["details"]
+
+def test_success_after_transient_error(broker):
+    calls = []
+
+    def render(job, cancelled):
+        calls.append(job["attempts"])
+        if len(calls) == 1:
+            raise TimeoutError("database is locked")
+        return {"video_url": "/videos/animation_a.mp4"}
+
+    run_once(broker, render)
+    run_once(broker, render)
+
+    assert calls == [1, 2]
+    assert broker.get("a")["result"] == {"video_url": "/videos/animation_a.mp4"}
@@ -0,0 +1,254 @@
+"""
+Shared LaTeX cache.
+
+Manim compiles every MathTex/Tex expression with latex + dvisvgm and skips
+the compile when the SVG for it already exists in its tex_dir. Renders run in
+throwaway media dirs, so this cache keeps those SVGs across renders.
+
+Renders never write to the shared directory directly. Each job gets its own
+tex_dir seeded with hard links to cached SVGs; after the render, the SVGs it
+compiled are published back with an atomic rename. Concurrent renders
+therefore never see a half-written file, and eviction (oldest first, bounded
+by size) cannot pull a file out from under a running render.
+
+Only the SVGs a scene is expected to use are seeded, so a job costs a few
+links per expression, not one per cached file. Manim names SVGs by a hash of
+the full .tex source, which depends on its template and version, so the cache
+learns the mapping instead of computing it: on publish, each literal
+expression in the scene is indexed under the SVGs whose .tex source contains
+all of its strings. Expressions built at runtime (f-strings, variables) or
+rewritten by Manim ({{ }} splitting) are never seeded and compile every time.
+
+Manim writes the .tex source of every expression it uses, cached or not, so
+the .tex files left in a job's tex_dir give exact per-job hit/miss counts.
+"""
+import ast
+import hashlib
+import os
+import shutil
+import time
+import uuid
+
+JOB_DIRS = "jobs"
+INDEX_DIR = "index"
+MAX_INDEXED_SVGS = 8  # Per expression; bounds seeding for common strings
+STALE_JOB_DIR_SECONDS = 24 * 3600
+TEX_CLASSES = ("MathTex", "Tex")
+
+class TexCache:
+    """Size-bounded directory of compiled LaTeX SVGs shared by all renders"""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, JOB_DIRS), exist_ok=True)
+        os.makedirs(os.path.join(root, INDEX_DIR), exist_ok=True)
+
+    def _svg_names(self):
+        return [name for name in os.listdir(self.root) if name.endswith(".svg")]
+
+    def _index_path(self, expression):
+        class_name, args = expression
+        key = "\0".join((class_name, *args)).encode("utf-8")
+        return os.path.join(self.root, INDEX_DIR, hashlib.sha256(key).hexdigest()[:32])
+
+    def _indexed_svgs(self, expression):
+        try:
+            with open(self._index_path(expression), encoding="utf-8") as f:
+                return f.read().split()
+        except FileNotFoundError:
+            return []
+
+    def prepare(self, job_id, expressions=()):
+        """Create a job's tex_dir seeded with the cached SVGs of the scene's tex
+        expressions (see tex_expressions); return (tex_dir, seeded names)"""
+        # Job dirs live inside the cache root so hard links never cross devices
+        tex_dir = os.path.join(self.root, JOB_DIRS, job_id)
+        os.makedirs(tex_dir, exist_ok=True)
+
+        seeded = set()
+        for name in {name for expression in expressions for name in self._indexed_svgs(expression)}:
+            source = os.path.join(self.root, name)
+            try:
+                os.link(source, os.path.join(tex_dir, name))
+            except FileNotFoundError:
+                continue  # Evicted since it was indexed
+            except OSError:
+                # No hard links on this filesystem
+                try:
+                    shutil.copy(source, os.path.join(tex_dir, name))
+                except OSError:
+                    continue
+            seeded.add(name)
+
+        return tex_dir, seeded
+
+    def publish(self, tex_dir, seeded, expressions=()):
+        """Move newly compiled SVGs into the cache and index them under the
+        scene's expressions; return hit/miss/seeded counts"""
+        hits = misses = 0
+        now = time.time()
+        sources = {}
+
+        for name in os.listdir(tex_dir):
+            if not name.endswith(".tex"):
+                continue
+            svg_name = name[:-len(".tex")] + ".svg"
+            svg_path = os.path.join(tex_dir, svg_name)
+
+            if svg_name in seeded:
+                hits += 1
+                try:
+                    os.utime(os.path.join(self.root, svg_name), (now, now))  # Mark recently used
+                except OSError:
+                    pass
+            elif os.path.exists(svg_path):
+                misses += 1
+                partial_path = os.path.join(self.root, f"{svg_name}.{uuid.uuid4().hex[:8]}.part")
+                try:
+                    shutil.copy(svg_path, partial_path)
+                    os.replace(partial_path, os.path.join(self.root, svg_name))
+                except OSError as e:
+                    print(f"Tex cache warning: could not publish {svg_name}: {e}")
+                    continue
+            else:
+                continue
+
+            try:
+                with open(os.path.join(tex_dir, name), encoding="utf-8") as f:
+                    sources[svg_name] = f.read()
+            except (OSError, ValueError):
+                pass
+
+        for expression in expressions:
+            self._index(expression, [
+                svg_name for svg_name, source in sources.items()
+                if all(arg in source for arg in expression[1])
+            ])
+
+        if misses:
+            self.evict()
+        return {"hits": hits, "misses": misses, "seeded": len(seeded)}
+
+    def _index(self, expression, svg_names):
+        if not svg_names:
+            return
+        indexed = self._indexed_svgs(expression)
+        # Most recently used first, so the cap drops the stalest entries
+        names = list(dict.fromkeys(sorted(svg_names) + indexed))[:MAX_INDEXED_SVGS]
+        if names == indexed:
+            return
+
+        # Concurrent publishes may drop each other's entries; that only costs
+        # a recompile, which indexes the SVG again
+        index_path = self._index_path(expression)
+        partial_path = f"{index_path}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            with open(partial_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(names) + "\n")
+            os.replace(partial_path, index_path)
+        except OSError as e:
+            print(f"Tex cache warning: could not index {expression[0]}: {e}")
+
+    def release(self, tex_dir):
+        """Remove a job's tex_dir"""
+        shutil.rmtree(tex_dir, ignore_errors=True)
+
+    def evict(self):
+        """Delete least recently used SVGs until the cache is under its size limit"""
+        entries = []
+        for name in self._svg_names():
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            # Trim to 90% so the next few misses do not trigger another pass
+            target = self.max_bytes * 0.9
+            for _, size, name in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._prune_index()
+
+        # Job dirs left behind by crashed workers
+        jobs_dir = os.path.join(self.root, JOB_DIRS)
+        cutoff = time.time() - STALE_JOB_DIR_SECONDS
+        for name in os.listdir(jobs_dir):
+            path = os.path.join(jobs_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+    def _prune_index(self):
+        """Drop index entries whose SVGs have all been evicted"""
+        index_dir = os.path.join(self.root, INDEX_DIR)
+        for name in os.listdir(index_dir):
+            path = os.path.join(index_dir, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    svg_names = f.read().split()
+            except (FileNotFoundError, ValueError):
+                continue
+            if not any(os.path.exists(os.path.join(self.root, svg_name)) for svg_name in svg_names):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        sizes = []
+        for name in self._svg_names():
+            try:
+                sizes.append(os.path.getsize(os.path.join(self.root, name)))
+            except FileNotFoundError:
+                pass
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+def write_manim_config(path, tex_dir):
+    """Write a Manim config file pointing tex_dir at a job's cache dir"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"[CLI]\ntex_dir = {tex_dir}\n")
+
+def tex_expressions(manim_code):
+    """(class name, string args) of every MathTex/Tex built from literals
+
+    Returns [] for code that does not parse (it will not render either).
+    """
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError:
+        return []
+    expressions = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in TEX_CLASSES):
+            continue
+        if node.args and all(isinstance(arg, ast.Constant) and isinstance(arg.value, str) for arg in node.args):
+            expression = (node.func.id, tuple(arg.value for arg in node.args))
+            if expression not in expressions:
+                expressions.append(expression)
+    return expressions
+
+def prewarm_script(expressions):
+    """A scene that only builds the given tex mobjects (render it with --dry_run)"""
+    lines = [
+        "from manim import *",
+        "",
+        "class PrewarmScene(Scene):",
+        "    def construct(self):"
+    ]
+    for class_name, args in expressions:
+        lines.append(f"        {class_name}({', '.join(repr(arg) for arg in args)})")
+    if not expressions:
+        lines.append("        pass")
+    return "\n".join(lines) + "\n"
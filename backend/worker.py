@@ -0,0 +1,151 @@
+"""
+Render worker.
+
+Claims jobs from the shared job queue, renders them and uploads the videos to
+shared storage, heartbeating while each render runs. Timings and outputs go
+back in the job result; the web tier records them in its metadata store, so
+workers never write to it. Any number of workers can run on any node that
+reaches the job broker and shares VIDEO_FOLDER and the render profile config
+(the default SQLite broker needs a local disk, so use a networked JOB_BROKER
+across nodes):
+
+    python worker.py --threads 2
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from job_queue import PermanentJobError
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_POLL_INTERVAL = 1.0
+
+class RenderWorker:
+    """Claim-render-report loop around a job broker"""
+
+    def __init__(self, broker, render, worker_id=None,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.broker = broker
+        self.render = render
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+
+    def _heartbeat(self, job_id, done, lost_lease):
+        # Renew well before the lease runs out so one slow write does not lose it
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                renewed = self.broker.heartbeat(job_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"[{self.worker_id}] Heartbeat for job {job_id} failed: {e}")
+                continue
+            if not renewed:
+                print(f"[{self.worker_id}] Lost lease on job {job_id}, cancelling render")
+                lost_lease.set()
+                return
+
+    def run_job(self, job):
+        """Render one claimed job and report the outcome to the broker"""
+        done = threading.Event()
+        lost_lease = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job["id"], done, lost_lease), daemon=True)
+        heartbeat.start()
+
+        try:
+            # render(job, cancelled) must stop soon after cancelled is set
+            result = self.render(job, lost_lease)
+        except Exception as e:
+            if lost_lease.is_set():
+                print(f"[{self.worker_id}] Abandoned job {job['id']} after losing its lease")
+                return
+            print(f"[{self.worker_id}] Job {job['id']} failed: {traceback.format_exc()}")
+            error = {
+                "error": getattr(e, "error", f"Generation failed: {str(e)}"),
+                "details": getattr(e, "details", str(e))
+            }
+            if getattr(e, "manim_code", None):
+                error["manim_code"] = e.manim_code
+            try:
+                if isinstance(e, PermanentJobError):
+                    self.broker.fail(job["id"], self.worker_id, error)
+                else:
+                    # Storage hiccups, lock timeouts and the like: try again
+                    # (the broker fails the job once it is out of attempts)
+                    self.broker.release(job["id"], self.worker_id, error)
+            except Exception as report_error:
+                print(f"[{self.worker_id}] Could not report job {job['id']} failure: {report_error}")
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+
+        try:
+            completed = self.broker.complete(job["id"], self.worker_id, result)
+        except Exception as e:
+            # The lease will expire and the job will be retried
+            print(f"[{self.worker_id}] Could not mark job {job['id']} done: {e}")
+            return
+        if not completed:
+            print(f"[{self.worker_id}] Job {job['id']} finished after its lease was reclaimed")
+
+    def run(self):
+        """Process jobs until stop() is called"""
+        print(f"[{self.worker_id}] Waiting for render jobs")
+        while not self.stopped.is_set():
+            try:
+                job = self.broker.claim(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"[{self.worker_id}] Could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self.stopped.wait(self.poll_interval)
+                continue
+
+            print(f"[{self.worker_id}] Rendering job {job['id']} (attempt {job['attempts']})")
+            self.run_job(job)
+
+    def stop(self):
+        self.stopped.set()
+
+def start_workers(broker, render, count, **kwargs):
+    """Run count workers on daemon threads and return them"""
+    workers = []
+    for _ in range(count):
+        worker = RenderWorker(broker, render, **kwargs)
+        threading.Thread(target=worker.run, daemon=True).start()
+        workers.append(worker)
+    return workers
+
+def main():
+    parser = argparse.ArgumentParser(description="Manim render worker")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WORKER_THREADS", "1")),
+                        help="concurrent renders in this process")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="seconds a claimed job stays leased without a heartbeat")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="seconds to wait when the queue is empty")
+    args = parser.parse_args()
+
+    from app import TEX_CACHE_PREWARM, job_broker, prewarm_tex_cache, render_job
+
+    if TEX_CACHE_PREWARM:
+        prewarm_tex_cache()
+
+    workers = start_workers(job_broker, render_job, args.threads,
+                            lease_seconds=args.lease, poll_interval=args.poll)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping workers")
+        for worker in workers:
+            worker.stop()
+
+if __name__ == "__main__":
+    main()